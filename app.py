@@ -1,6 +1,26 @@
 import io
+import time
 import streamlit as st
 from backend import QRCodeGenerator
+from render_cache import RenderCache, make_cache_key
+from serializers import OUTPUT_FORMATS
+from upload_jobs import QUEUED, UploadQueue
+
+# Seconds between upload progress refreshes
+UPLOAD_POLL_INTERVAL = 0.5
+
+# Memory for rendered images shared by all sessions; sessions only keep
+# their packed matrix, so evicted images are simply rendered again
+IMAGE_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Download format -> label shown in the picker
+DOWNLOAD_FORMATS = {
+    'png': 'PNG image',
+    'svg': 'SVG vector',
+    'pbm': 'PBM bitmap',
+    'pgm': 'PGM graymap',
+    'bits': 'Packed module matrix',
+}
 
 # Page config
 st.set_page_config(
@@ -320,15 +340,124 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize backend generator
-if 'qr_generator' not in st.session_state:
-    st.session_state.qr_generator = QRCodeGenerator()
+
+@st.cache_resource
+def get_generator():
+    """One generator per server process, shared by every session and rerun."""
+    return QRCodeGenerator(link_store='upload_links.db')
+
+
+@st.cache_resource
+def get_upload_queue():
+    """Background upload jobs, shared so they outlive reruns and sessions."""
+    return UploadQueue(get_generator())
+
+
+@st.cache_resource
+def get_image_cache():
+    """Rendered images of every session, evicted LRU within IMAGE_MEMORY_BUDGET."""
+    return RenderCache(max_entries=4096, max_memory_bytes=IMAGE_MEMORY_BUDGET)
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def qr_matrix(data):
+    """Encode data once into a packed QRMatrix; colors and formats reuse it."""
+    return get_generator().make_qr_matrix(data)
+
+
+def make_qr(data, fill_color, back_color):
+    """
+    Encode a QR code for the session.
+
+    Returns:
+        tuple: (QRMatrix, fill color, background color), the only
+            state a session keeps for its QR code
+    """
+    return (qr_matrix(data), fill_color, back_color)
+
+
+def render_qr(qr, output_format='png'):
+    """Render a session's QR code on demand, through the shared image cache."""
+    matrix, fill_color, back_color = qr
+    cache = get_image_cache()
+    key = make_cache_key(matrix=matrix.to_bytes().hex(), fill_color=fill_color,
+                         back_color=back_color, output_format=output_format)
+    image = cache.get(key)
+    if image is None:
+        image = get_generator().render(
+            matrix,
+            fill_color=fill_color,
+            back_color=back_color,
+            output_format=output_format
+        ).getvalue()
+        cache.put(key, image)
+    return image
+
+
+def format_size(num_bytes):
+    """Human-readable file size."""
+    size = num_bytes / 1024
+    if size > 1024:
+        return f"{size/1024:.2f} MB"
+    return f"{size:.2f} KB"
+
+
+def show_upload_job():
+    """Show the running upload's progress; render its QR once the link is in."""
+    job_ref = st.session_state.upload_job
+    job = get_upload_queue().get(job_ref['id']) if job_ref else None
+    if job is None:
+        st.session_state.upload_job = None
+        return
+    
+    if job['state'] == QUEUED:
+        st.progress(0.0, text="⏳ Waiting for a free upload slot...")
+        return
+    if job['result'] is None:
+        if job['service'] is None:
+            st.progress(0.0, text="🔍 Checking for a previous upload of this file...")
+        elif job['size'] and job['bytes_sent'] >= job['size']:
+            st.progress(1.0, text=f"⏳ Sent • waiting for {job['service']} to respond...")
+        else:
+            st.progress(
+                job['fraction'],
+                text=f"⬆️ Uploading to {job['service']} • "
+                     f"{format_size(job['bytes_sent'])} of {format_size(job['size'] or 0)}"
+            )
+        return
+    
+    # Finished: hand the result to the main page and stop polling
+    st.session_state.upload_job = None
+    result = job['result']
+    if result['success']:
+        try:
+            st.session_state.qr = make_qr(result['url'], job_ref['fg'], job_ref['bg'])
+            st.session_state.upload_info = result
+            st.session_state.upload_notice = ('success', "✅ **QR code generated successfully!**")
+        except Exception as e:
+            st.session_state.upload_notice = ('error', f"❌ **Error:** {str(e)}")
+    else:
+        st.session_state.upload_notice = ('error', f"❌ **Upload failed:** {result['message']}")
+    st.rerun()
+
+
+if hasattr(st, 'fragment'):
+    # Re-runs only this function while a job is shown, so the rest of the
+    # page stays interactive during the upload
+    upload_status = st.fragment(run_every=UPLOAD_POLL_INTERVAL)(show_upload_job)
+else:
+    upload_status = show_upload_job
+
 
 # Initialize session state for generated QR codes
-if 'qr_image' not in st.session_state:
-    st.session_state.qr_image = None
+if 'qr' not in st.session_state:
+    st.session_state.qr = None
 if 'upload_info' not in st.session_state:
     st.session_state.upload_info = None
+if 'upload_job' not in st.session_state:
+    st.session_state.upload_job = None
+if 'upload_notice' not in st.session_state:
+    st.session_state.upload_notice = None
 
 # Title and Subtitle
 st.markdown("<h1>⚡ QR CODE GENERATOR PRO</h1>", unsafe_allow_html=True)
@@ -366,15 +495,11 @@ with col_left:
             if text_input.strip():
                 with st.spinner("⚡ Generating your QR code..."):
                     try:
-                        # Generate QR code from text
-                        qr_buffer = st.session_state.qr_generator.generate_qr_code(
-                            text_input.strip(),
-                            fill_color=text_fg_color,
-                            back_color=text_bg_color
-                        )
+                        # Encode the QR code (cached across reruns)
+                        qr = make_qr(text_input.strip(), text_fg_color, text_bg_color)
                         
-                        # Store in session state
-                        st.session_state.qr_image = qr_buffer
+                        # Store in session state; the image is rendered on display
+                        st.session_state.qr = qr
                         st.session_state.upload_info = None
                         st.success("✅ **QR code generated successfully!**")
                         
@@ -395,11 +520,7 @@ with col_left:
         )
         
         if uploaded_file:
-            file_size = len(uploaded_file.getvalue()) / 1024
-            if file_size > 1024:
-                file_size_display = f"{file_size/1024:.2f} MB"
-            else:
-                file_size_display = f"{file_size:.2f} KB"
+            file_size_display = format_size(uploaded_file.size)
             
             # Show file icon based on type
             file_ext = uploaded_file.name.split('.')[-1].lower()
@@ -426,40 +547,46 @@ with col_left:
         
         st.markdown("")  # Spacing
         
-        # Generate button for file
+        # Generate button for file: the upload runs as a background job
         if st.button("🚀 UPLOAD & GENERATE", key="file_btn"):
             if uploaded_file:
-                with st.spinner("⚡ Uploading file and generating QR code..."):
-                    try:
-                        # Upload file and generate QR from link
-                        qr_buffer, upload_result = st.session_state.qr_generator.generate_qr_from_file(
-                            uploaded_file.getvalue(),
-                            uploaded_file.name,
-                            fill_color=file_fg_color,
-                            back_color=file_bg_color
-                        )
-                        
-                        # Store in session state
-                        st.session_state.qr_image = qr_buffer
-                        st.session_state.upload_info = upload_result
-                        st.success("✅ **QR code generated successfully!**")
-                        
-                    except Exception as e:
-                        st.error(f"❌ **Upload failed:** {str(e)}")
+                # getvalue() shares the uploaded buffer; the job must not read
+                # the widget's file object, which belongs to this script run
+                job_id = get_upload_queue().submit(
+                    uploaded_file.getvalue(),
+                    uploaded_file.name,
+                    size=uploaded_file.size
+                )
+                st.session_state.upload_job = {
+                    'id': job_id, 'fg': file_fg_color, 'bg': file_bg_color
+                }
+                st.session_state.upload_notice = None
             else:
                 st.warning("⚠️ **Please upload a file first**")
+        
+        if st.session_state.upload_job:
+            upload_status()
+        elif st.session_state.upload_notice:
+            kind, message = st.session_state.upload_notice
+            st.session_state.upload_notice = None
+            if kind == 'success':
+                st.success(message)
+            else:
+                st.error(message)
 
 with col_right:
     st.markdown("### Generated QR Code")
     
     # Display QR code if available
-    if st.session_state.qr_image:
+    if st.session_state.qr:
         # Display the QR code
-        st.image(st.session_state.qr_image, use_container_width=True)
+        st.image(render_qr(st.session_state.qr), use_container_width=True)
         
         # If this was from a file upload, show upload info
         if st.session_state.upload_info:
             st.info(f"**📡 Hosting Service:** {st.session_state.upload_info['service']}")
+            if st.session_state.upload_info.get('cached'):
+                st.caption("♻️ Same file was uploaded before - reusing its still-valid link")
             st.success(f"**{st.session_state.upload_info['message']}**")
             
             with st.expander("🔗 **View Direct Link**"):
@@ -467,13 +594,23 @@ with col_right:
         
         st.markdown("")  # Spacing
         
+        # Download format picker; other formats are serialized from the matrix
+        download_format = st.selectbox(
+            "Download format",
+            list(DOWNLOAD_FORMATS),
+            format_func=DOWNLOAD_FORMATS.get,
+            key="download_format"
+        )
+        extension, mime = OUTPUT_FORMATS[download_format]
+        
+        download_data = render_qr(st.session_state.qr, download_format)
+        
         # Download button
-        st.session_state.qr_image.seek(0)
         st.download_button(
             label="⬇️ DOWNLOAD QR CODE",
-            data=st.session_state.qr_image.read(),
-            file_name="qr_code.png",
-            mime="image/png",
+            data=download_data,
+            file_name=f"qr_code.{extension}",
+            mime=mime,
             use_container_width=True
         )
     else:
@@ -506,4 +643,9 @@ st.markdown("""
     <p style='margin: 0;'>⚡ Built with Streamlit • Powered by Multiple Hosting Services</p>
     <p style='margin: 0.5rem 0 0 0; font-size: 0.9rem;'>Professional QR Code Generation Tool</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Without fragments, poll by re-running the page while an upload is running
+if st.session_state.upload_job and not hasattr(st, 'fragment'):
+    time.sleep(UPLOAD_POLL_INTERVAL)
+    st.rerun()
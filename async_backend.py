@@ -0,0 +1,432 @@
+"""
+QR Code Generator Async Backend
+Native asyncio API: non-blocking uploads over a shared aiohttp connection
+pool, with CPU-bound rendering offloaded to an executor
+"""
+
+import asyncio
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp is optional
+    aiohttp = None
+
+from backend import (
+    GOFILE_SERVER_READ_TIMEOUT,
+    MB,
+    PROVIDER_MESSAGES,
+    TUS_VERSION,
+    QRCodeGenerator,
+    _render_batch_chunk,
+)
+from link_store import hash_content
+from upload_stream import CHUNK_SIZE, UploadSource
+
+
+class AsyncQRCodeGenerator:
+    """
+    Async counterpart of QRCodeGenerator.
+
+    Settings, the render cache, the link store and provider health are taken
+    from a wrapped QRCodeGenerator, so both APIs behave the same. Use it as
+    an async context manager, or call close() when done.
+    """
+
+    def __init__(self, generator=None, executor=None, connection_limit=100,
+                 connection_limit_per_host=20, **generator_kwargs):
+        """
+        Initialize the async generator.
+
+        Args:
+            generator (QRCodeGenerator): Sync generator whose settings, cache,
+                link store and provider health are shared (created from
+                generator_kwargs if omitted)
+            executor (Executor): Where rendering runs (the loop's default
+                thread pool if None; a ProcessPoolExecutor also works).
+                Blocking file and SQLite I/O always uses the default pool.
+            connection_limit (int): Total connections in the shared pool
+            connection_limit_per_host (int): Connections per provider host
+            **generator_kwargs: Passed to QRCodeGenerator
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncQRCodeGenerator requires aiohttp to be installed")
+        self.generator = generator or QRCodeGenerator(**generator_kwargs)
+        self.executor = executor
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the shared HTTP connection pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def generate_qr_code(self, data, fill_color='black', back_color='white',
+                               output_format='png'):
+        """
+        Generate a QR code without blocking the event loop.
+
+        Args:
+            data (str): The text or URL to encode
+            fill_color (str): Color of the QR code boxes
+            back_color (str): Background color
+            output_format (str): Output format, as in
+                QRCodeGenerator.generate_qr_code()
+
+        Returns:
+            BytesIO: Buffer containing the encoded QR code
+
+        Raises:
+            ValueError: If data is empty or the output format is unknown
+            Exception: If QR code generation fails
+        """
+        if not data or not data.strip():
+            raise ValueError("Data cannot be empty")
+
+        generator = self.generator
+        generator._check_output_format(output_format)
+        cache_key = None
+        if generator.cache is not None:
+            cache_key = generator._cache_key(data, fill_color, back_color, output_format)
+            cached = generator.cache.get(cache_key)
+            if cached is not None:
+                if generator.metrics is not None:
+                    generator.metrics.count_render(output_format, 'hit')
+                return BytesIO(cached)
+
+        if generator.metrics is not None:
+            generator.metrics.count_render(output_format, 'off' if cache_key is None else 'miss')
+
+        # The worker renders uncached; the result is cached here instead.
+        # A thread reports its stages to our registry directly, a worker
+        # process returns them; 'executor' also covers the queueing.
+        settings = generator.render_settings(fill_color, back_color, output_format)
+        settings['cache'] = False
+        shared = None if isinstance(self.executor, ProcessPoolExecutor) else generator.metrics
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with generator._in_flight('render'):
+            result, = await loop.run_in_executor(
+                self.executor, _render_batch_chunk, settings, [(0, data)], shared
+            )
+        if generator.metrics is not None:
+            generator.metrics.observe_stages(result.timings)
+            generator.metrics.observe_stage('executor', loop.time() - start)
+        if result.error:
+            raise Exception(result.error)
+
+        if cache_key is not None:
+            generator.cache.put(cache_key, result.image)
+        return BytesIO(result.image)
+
+    async def upload_file_and_get_link(self, file_bytes, filename, deadline=None):
+        """
+        Upload a file without blocking the event loop.
+
+        Providers are tried in the generator's ranked order. Cancelling the
+        calling task aborts the upload in flight.
+
+        Args:
+            file_bytes: The file content as bytes, a memory-mapped file, a
+                path, or a seekable binary file-like object
+            filename (str): Name of the file
+            deadline (float): Overall time limit in seconds
+                (defaults to the generator's upload_deadline)
+
+        Returns:
+            dict: Contains 'success', 'url', 'service', and 'message'
+        """
+        if deadline is None:
+            deadline = self.generator.upload_deadline
+
+        upload = UploadSource(file_bytes)
+        try:
+            if deadline is None:
+                return await self._upload(upload, filename)
+            return await asyncio.wait_for(self._upload(upload, filename), deadline)
+        except asyncio.TimeoutError:
+            return QRCodeGenerator._upload_failure(
+                f'❌ Upload deadline of {deadline:g}s exceeded. Please try again.'
+            )
+        finally:
+            upload.close()
+
+    async def _upload(self, upload, filename):
+        generator = self.generator
+        loop = asyncio.get_running_loop()
+
+        digest = None
+        if generator.link_store is not None:
+            digest = await loop.run_in_executor(None, hash_content, upload.reader())
+            stored = await loop.run_in_executor(None, generator.link_store.lookup, digest)
+            if stored:
+                if generator.metrics is not None:
+                    generator.metrics.count_upload('reused')
+                return QRCodeGenerator._upload_success(
+                    stored['service'], stored['url'],
+                    PROVIDER_MESSAGES.get(stored['service'], '✓ Link reused'),
+                    cached=True
+                )
+
+        providers = generator._ranked_providers(upload.size)
+        if not providers:
+            return QRCodeGenerator._upload_failure(
+                f'❌ No upload service accepts files of {upload.size / MB:.1f} MB.'
+            )
+        with generator._in_flight('upload'):
+            for service, method, message in providers:
+                url = await self._try_provider(service, method, upload, filename)
+                if url:
+                    if digest is not None:
+                        await loop.run_in_executor(
+                            None, generator.link_store.record,
+                            digest, upload.size, service, url
+                        )
+                    result = QRCodeGenerator._upload_success(service, url, message)
+                    break
+            else:
+                result = QRCodeGenerator._upload_failure()
+
+        if generator.metrics is not None:
+            generator._count_upload(result, providers)
+        return result
+
+    async def _try_provider(self, service, method, upload, filename):
+        """Run one provider's upload, returning its URL or None on failure."""
+        health = self.generator.health
+        if not health.begin_attempt(service):
+            return None
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        url = None
+        try:
+            url = await getattr(self, method)(upload, filename)
+        except asyncio.CancelledError:
+            # A cancelled request says nothing about the provider's health
+            health.abandon_attempt(service)
+            raise
+        except Exception as e:
+            print(f"{service} failed: {e}")
+
+        elapsed = loop.time() - start
+        health.record(service, bool(url), elapsed)
+        if self.generator.metrics is not None:
+            self.generator.metrics.observe_attempt(service, bool(url), elapsed)
+        return url
+
+    def _timeout(self, service, read_timeout=None):
+        """Get the aiohttp timeout for a provider request."""
+        connect, read = self.generator._timeout(service, read_timeout)
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    def _body(self, upload, field, filename, fields=None):
+        """
+        Build a streaming multipart body and its headers.
+
+        Returns:
+            tuple: (async iterator of body chunks, request headers)
+        """
+        body = upload.multipart(field, filename, fields)
+        headers = dict(body.headers)
+        headers['Content-Length'] = str(len(body))
+
+        async def chunks():
+            loop = asyncio.get_running_loop()
+            while True:
+                if upload.in_memory:
+                    chunk = body.read(CHUNK_SIZE)
+                else:
+                    chunk = await loop.run_in_executor(None, body.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+        return chunks(), headers
+
+    async def _upload_to_catbox(self, upload, filename):
+        """Upload to catbox.moe - PERMANENT storage!"""
+        data, headers = self._body(upload, 'fileToUpload', filename, {'reqtype': 'fileupload'})
+        async with self._get_session().post(
+            self.generator.endpoints['catbox_upload'], data=data, headers=headers,
+            timeout=self._timeout('catbox.moe')
+        ) as response:
+            text = await response.text()
+            if response.status == 200 and text.startswith('https://'):
+                return text.strip()
+        return None
+
+    async def _upload_to_pixeldrain(self, upload, filename):
+        """Upload to pixeldrain.com - 90+ days storage."""
+        data, headers = self._body(upload, 'file', filename)
+        async with self._get_session().post(
+            self.generator.endpoints['pixeldrain_upload'], data=data, headers=headers,
+            timeout=self._timeout('pixeldrain.com')
+        ) as response:
+            if response.status == 201:
+                result = await response.json(content_type=None)
+                file_id = result.get('id')
+                if file_id:
+                    return self.generator.endpoints['pixeldrain_link'].format(id=file_id)
+        return None
+
+    async def _upload_to_0x0(self, upload, filename):
+        """Upload to 0x0.st - 365 days storage."""
+        data, headers = self._body(upload, 'file', filename)
+        async with self._get_session().post(
+            self.generator.endpoints['0x0_upload'], data=data, headers=headers,
+            timeout=self._timeout('0x0.st')
+        ) as response:
+            if response.status == 200:
+                return (await response.text()).strip()
+        return None
+
+    async def _upload_to_gofile(self, upload, filename):
+        """Upload to gofile.io service."""
+        session = self._get_session()
+        async with session.get(
+            self.generator.endpoints['gofile_server'],
+            timeout=self._timeout('gofile.io', GOFILE_SERVER_READ_TIMEOUT)
+        ) as server_response:
+            if server_response.status != 200:
+                return None
+            server_data = await server_response.json(content_type=None)
+
+        if server_data.get('status') != 'ok':
+            return None
+
+        server = server_data['data']['server']
+
+        data, headers = self._body(upload, 'file', filename)
+        async with session.post(
+            self.generator.endpoints['gofile_upload'].format(server=server),
+            data=data,
+            headers=headers,
+            timeout=self._timeout('gofile.io')
+        ) as upload_response:
+            if upload_response.status == 200:
+                result = await upload_response.json(content_type=None)
+                if result.get('status') == 'ok':
+                    return result['data']['downloadPage']
+        return None
+
+    async def _upload_to_fileio(self, upload, filename):
+        """Upload to file.io service - BACKUP ONLY."""
+        data, headers = self._body(upload, 'file', filename)
+        async with self._get_session().post(
+            self.generator.endpoints['fileio_upload'], data=data, headers=headers,
+            timeout=self._timeout('file.io')
+        ) as response:
+            if response.status == 200:
+                result = await response.json(content_type=None)
+                if result.get('success'):
+                    return result.get('link')
+        return None
+
+    async def _upload_to_tus(self, upload, filename):
+        """Upload to a tus server in resumable chunks (see QRCodeGenerator)."""
+        generator = self.generator
+        session = self._get_session()
+        timeout = self._timeout('tus')
+        loop = asyncio.get_running_loop()
+        endpoint = generator.endpoints['tus_upload']
+        metadata = base64.b64encode(filename.encode('utf-8')).decode('ascii')
+
+        async with session.post(endpoint, headers={
+            'Tus-Resumable': TUS_VERSION,
+            'Upload-Length': str(upload.size),
+            'Upload-Metadata': f'filename {metadata}',
+        }, timeout=timeout) as response:
+            if response.status != 201 or not response.headers.get('Location'):
+                return None
+            location = urljoin(endpoint, response.headers['Location'])
+
+        offset = 0
+        failures = 0
+        while offset < upload.size:
+            if upload.in_memory:
+                chunk = upload.read_at(offset, generator.tus_chunk_size)
+            else:
+                chunk = await loop.run_in_executor(
+                    None, upload.read_at, offset, generator.tus_chunk_size
+                )
+            try:
+                async with session.patch(location, data=chunk, headers={
+                    'Tus-Resumable': TUS_VERSION,
+                    'Upload-Offset': str(offset),
+                    'Content-Type': 'application/offset+octet-stream',
+                }, timeout=timeout) as response:
+                    if response.status == 204:
+                        offset = int(response.headers['Upload-Offset'])
+                        failures = 0
+                        continue
+                    print(f"tus chunk at {offset} failed: HTTP {response.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"tus chunk at {offset} failed: {e}")
+
+            failures += 1
+            if failures > generator.max_retries:
+                return None
+            await asyncio.sleep(generator.backoff_factor * 2 ** (failures - 1))
+            try:
+                async with session.head(location, headers={'Tus-Resumable': TUS_VERSION},
+                                        timeout=timeout) as response:
+                    if response.status in (404, 410):
+                        return None
+                    if response.status == 200:
+                        offset = int(response.headers['Upload-Offset'])
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"tus offset check failed: {e}")
+
+        return location
+
+    async def generate_qr_from_file(self, file_bytes, filename, fill_color='black',
+                                    back_color='white', deadline=None):
+        """
+        Upload any file and generate QR code from the link.
+
+        Cancelling the calling task cancels the upload in flight.
+
+        Args:
+            file_bytes: File content as bytes, a memory-mapped file, a path,
+                or a seekable binary file-like object
+            filename (str): File name (with extension)
+            fill_color (str): QR code color
+            back_color (str): Background color
+            deadline (float): Overall upload time limit in seconds
+
+        Returns:
+            tuple: (qr_image_buffer, upload_info)
+        """
+        upload_result = await self.upload_file_and_get_link(file_bytes, filename, deadline)
+
+        if not upload_result['success']:
+            raise Exception(upload_result['message'])
+
+        qr_image = await self.generate_qr_code(
+            upload_result['url'],
+            fill_color=fill_color,
+            back_color=back_color
+        )
+
+        return qr_image, upload_result
@@ -3,25 +3,227 @@ QR Code Generator Backend
 Handles QR code generation with improved long-term file hosting
 """
 
+import base64
+import os
+import threading
+import time
 import qrcode
+from qrcode.image.pil import PilImage
+from collections import deque, namedtuple
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import BytesIO
+from urllib.parse import urljoin
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from link_store import LinkStore, hash_content
+from metrics import Metrics, default_metrics
+from provider_health import HealthTracker
+from render_cache import RenderCache, default_cache, make_cache_key
+from upload_stream import ProgressSource, UploadSource
+from rasterizer import np, rasterize, to_palette
+from mask_penalty import MASK_PATTERNS, make_best_mask
+from segmenter import fit
+from qr_matrix import QRMatrix
+from qr_tables import worker_initializer
+from serializers import OUTPUT_FORMATS, serialize
+
+RENDERERS = ('numpy', 'qrcode')
+
+# 'optimal' splits the payload into the fewest-bit mixed-mode segments and
+# computes the version directly; 'qrcode' keeps the library's encoding
+SEGMENTATIONS = ('optimal', 'qrcode')
+
+ERROR_CORRECTION_LEVELS = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
+# PNG compression presets: zlib level 1 for latency-sensitive requests,
+# level 9 for stored assets. An integer 0-9 is accepted as well.
+PNG_COMPRESSION = {
+    'fastest': {'compress_level': 1},
+    'default': {'compress_level': 6},
+    'smallest': {'compress_level': 9},
+}
+
+# Upload providers in order of preference: longest-lived links first. A
+# self-hosted tus server leads the chain when its endpoint is configured.
+UPLOAD_PROVIDERS = [
+    ('tus', '_upload_to_tus', '✓ Stored on your own upload server'),
+    ('catbox.moe', '_upload_to_catbox', '✓ PERMANENT link - Never expires!'),
+    ('pixeldrain.com', '_upload_to_pixeldrain', '✓ Link available for 90+ days'),
+    ('0x0.st', '_upload_to_0x0', '✓ Link available for 365 days (1 year)'),
+    ('gofile.io', '_upload_to_gofile', '✓ Link expires after 10 days of inactivity'),
+    ('file.io', '_upload_to_fileio', '⚠️ Link expires after FIRST download or 14 days'),
+]
+
+PROVIDER_MESSAGES = {service: message for service, _, message in UPLOAD_PROVIDERS}
+
+MB = 1000 * 1000
+MIB = 1024 * 1024
+
+# What each provider accepts, so files are only sent where they fit:
+# max_size in bytes (None for no published limit), the endpoint that must
+# be configured for the provider to be used, and supported features.
+# 'resumable' providers take chunked tus uploads that continue from the
+# last confirmed chunk after a failure. The public providers publish no
+# resumable API, so only a self-hosted tus server gets chunked uploads.
+# Limits are the published ones; override them with capabilities=.
+PROVIDER_CAPABILITIES = {
+    'tus': {'max_size': None, 'endpoint': 'tus_upload', 'features': frozenset({'resumable'})},
+    'catbox.moe': {'max_size': 200 * MB, 'endpoint': 'catbox_upload', 'features': frozenset()},
+    'pixeldrain.com': {'max_size': 20 * 1000 * MB, 'endpoint': 'pixeldrain_upload',
+                       'features': frozenset()},
+    '0x0.st': {'max_size': 512 * MIB, 'endpoint': '0x0_upload', 'features': frozenset()},
+    'gofile.io': {'max_size': None, 'endpoint': 'gofile_upload', 'features': frozenset()},
+    'file.io': {'max_size': 2000 * MB, 'endpoint': 'fileio_upload', 'features': frozenset()},
+}
+
+# tus resumable upload protocol version and default PATCH size
+TUS_VERSION = '1.0.0'
+TUS_CHUNK_SIZE = 8 * MIB
+
+# Provider API endpoints; override them (e.g. with fake_providers) for testing
+DEFAULT_ENDPOINTS = {
+    'catbox_upload': 'https://catbox.moe/user/api.php',
+    'pixeldrain_upload': 'https://pixeldrain.com/api/file',
+    'pixeldrain_link': 'https://pixeldrain.com/u/{id}',
+    '0x0_upload': 'https://0x0.st',
+    'gofile_server': 'https://api.gofile.io/getServer',
+    'gofile_upload': 'https://{server}.gofile.io/uploadFile',
+    'fileio_upload': 'https://file.io',
+    # Self-hosted tus server (e.g. tusd) creation URL; None leaves it out
+    'tus_upload': None,
+}
+
+# Default read timeouts (seconds) per provider upload request
+PROVIDER_READ_TIMEOUTS = {
+    'catbox.moe': 60,
+    'pixeldrain.com': 60,
+    '0x0.st': 30,
+    'gofile.io': 60,
+    'file.io': 30,
+    'tus': 60,
+}
+GOFILE_SERVER_READ_TIMEOUT = 10
+
+# HTTP statuses worth retrying: transient server-side failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# One item of generate_batch() output: image is the encoded bytes, or None with error set.
+# timings holds (stage, seconds) pairs from a worker process, for the caller to observe.
+BatchResult = namedtuple('BatchResult', ['index', 'data', 'image', 'error', 'timings'],
+                         defaults=((),))
+
+
 class QRCodeGenerator:
     """Backend class that handles QR code generation logic."""
     
-    def __init__(self, box_size=10, border=4):
+    def __init__(self, box_size=10, border=4, cache=True, renderer=None,
+                 error_correction='L', mask_pattern=None, png_compression='default',
+                 segmentation='optimal', hedge_delay=None, upload_deadline=None,
+                 connect_timeout=10, read_timeout=None, max_retries=3,
+                 backoff_factor=0.5, pool_maxsize=10, link_store=None,
+                 ranking='longevity', health=None, endpoints=None, capabilities=None,
+                 tus_chunk_size=TUS_CHUNK_SIZE, metrics=False):
         """
         Initialize the QR code generator with default settings.
         
         Args:
             box_size (int): Size of each box in the QR code
             border (int): Thickness of the border
+            cache (RenderCache or bool): Render cache to use. True shares the
+                process-wide default cache, False disables caching.
+            renderer (str): 'numpy' for the vectorized rasterizer or 'qrcode'
+                for the library's per-module drawing. Defaults to 'numpy'
+                when NumPy is installed.
+            error_correction (str): Error correction level: 'L', 'M', 'Q' or 'H'
+            mask_pattern (int): Fixed mask pattern (0-7) that skips the mask
+                search, for bulk jobs where scan robustness is not tuned.
+                None picks the lowest-penalty mask.
+            png_compression (str or int): 'fastest', 'default', 'smallest'
+                (see PNG_COMPRESSION) or a zlib level 0-9. PNGs are always
+                written as 1-bit or 2-entry palette images.
+            segmentation (str): 'optimal' encodes the data as the mixed
+                numeric/alphanumeric/byte segments with the fewest bits, which
+                can need a smaller version; 'qrcode' uses the library's own
+                segmentation and version search
+            hedge_delay (float): Default seconds to wait on an upload provider
+                before starting the next one in parallel (None disables hedging)
+            upload_deadline (float): Default overall upload time limit in seconds
+            connect_timeout (float): TCP/TLS connect timeout for uploads
+            read_timeout (float): Read timeout for every provider (None keeps
+                the per-provider defaults in PROVIDER_READ_TIMEOUTS)
+            max_retries (int): Retries for connection errors and 5xx responses
+            backoff_factor (float): Base of the jittered exponential backoff
+            pool_maxsize (int): Keep-alive connections kept per host
+            link_store (LinkStore or str): Store (or SQLite path) used to reuse
+                still-valid links for files uploaded before
+            ranking (str): 'longevity' tries providers in the fixed preference
+                order, 'adaptive' balances link lifetime against live latency
+            health (HealthTracker): Shared provider health tracker (a new
+                one with circuit breakers is created by default)
+            endpoints (dict): Overrides for DEFAULT_ENDPOINTS
+            capabilities (dict): Per-provider overrides for
+                PROVIDER_CAPABILITIES (e.g. a changed size limit)
+            tus_chunk_size (int): Bytes sent per request to resumable
+                providers; a failure costs at most one chunk
+            metrics (Metrics or bool): Registry for render stage timings,
+                provider attempts and upload outcomes. True shares the
+                process-wide default_metrics; False disables them.
         """
         self.box_size = box_size
         self.border = border
+        self.renderer = self._check_renderer(renderer)
+        self.error_correction = self._check_error_correction(error_correction)
+        self.mask_pattern = self._check_mask_pattern(mask_pattern)
+        self.png_compression = self._check_png_compression(png_compression)
+        self.segmentation = self._check_segmentation(segmentation)
+        self.hedge_delay = hedge_delay
+        self.upload_deadline = upload_deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self.endpoints = dict(DEFAULT_ENDPOINTS, **(endpoints or {}))
+        self.capabilities = {
+            service: dict(capability, **(capabilities or {}).get(service, {}))
+            for service, capability in PROVIDER_CAPABILITIES.items()
+        }
+        self.tus_chunk_size = tus_chunk_size
+        
+        if isinstance(link_store, str):
+            link_store = LinkStore(link_store)
+        self.link_store = link_store
+        
+        if health is None:
+            health = HealthTracker(ranking=ranking)
+        self.health = health
+        
+        if cache is True:
+            self.cache = default_cache
+        elif isinstance(cache, RenderCache):
+            self.cache = cache
+        else:
+            self.cache = None
+        
+        if metrics is True:
+            self.metrics = default_metrics
+        elif isinstance(metrics, Metrics):
+            self.metrics = metrics
+        else:
+            self.metrics = None
     
-    def generate_qr_code(self, data, fill_color='black', back_color='white'):
+    def generate_qr_code(self, data, fill_color='black', back_color='white',
+                         output_format='png'):
         """
         Generate a QR code from any text or URL.
         
@@ -29,158 +231,802 @@ class QRCodeGenerator:
             data (str): The text or URL to encode
             fill_color (str): Color of the QR code boxes
             back_color (str): Background color
+            output_format (str): 'png', 'svg' (a single merged path),
+                'pbm'/'pgm' (binary Netpbm) or 'bits' (the packed module
+                matrix, see serializers.pack_bits). Only 'png' is rasterized.
             
         Returns:
-            BytesIO: Image buffer containing the QR code PNG
+            BytesIO: Buffer containing the encoded QR code
             
         Raises:
-            ValueError: If data is empty
+            ValueError: If data is empty or the output format is unknown
             Exception: If QR code generation fails
         """
         if not data or not data.strip():
             raise ValueError("Data cannot be empty")
+        self._check_output_format(output_format)
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(data, fill_color, back_color, output_format)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.count_render(output_format, 'hit')
+                return BytesIO(cached)
+        
+        if self.metrics is not None:
+            self.metrics.count_render(output_format, 'off' if cache_key is None else 'miss')
         
         try:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=self.box_size,
-                border=self.border,
-            )
-            
-            qr.add_data(data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color=fill_color, back_color=back_color)
+            with self._in_flight('render'):
+                qr = self._stage('encode', self._encode_data, data)
+                self._stage('make', self._make_matrix, qr)
+                buf = self._encode_matrix(qr.modules, fill_color, back_color, output_format)
             
-            buf = BytesIO()
-            img.save(buf, format='PNG')
-            buf.seek(0)
+        except Exception as e:
+            raise Exception(f"Failed to generate QR code: {str(e)}")
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, buf.getvalue())
+        
+        return buf
+    
+    def make_matrix(self, data):
+        """
+        Encode data into its QR module matrix, without rendering it.
+        
+        The matrix depends only on the data, error correction level, mask
+        and segmentation settings, so it can be cached and rendered
+        repeatedly with different colors or formats via render().
+        
+        Args:
+            data (str): The text or URL to encode
             
-            return buf
+        Returns:
+            list: Module rows as lists of booleans (True is dark)
             
+        Raises:
+            ValueError: If data is empty
+            Exception: If encoding fails
+        """
+        if not data or not data.strip():
+            raise ValueError("Data cannot be empty")
+        
+        try:
+            qr = self._stage('encode', self._encode_data, data)
+            self._stage('make', self._make_matrix, qr)
         except Exception as e:
             raise Exception(f"Failed to generate QR code: {str(e)}")
+        return qr.modules
     
-    def upload_file_and_get_link(self, file_bytes, filename):
+    def make_qr_matrix(self, data):
         """
-        Upload file to hosting service and get shareable link.
-        Prioritizes services with LONGER expiration times.
+        Encode data into a compact, bit-packed QRMatrix.
+        
+        Same matrix as make_matrix(), at one bit per module. It is hashable
+        and cheap to pickle, so it suits caches and worker processes, and
+        render() takes it directly.
         
         Args:
-            file_bytes (bytes): The file content
-            filename (str): Name of the file
+            data (str): The text or URL to encode
+            
+        Returns:
+            QRMatrix: The packed module matrix
+            
+        Raises:
+            ValueError: If data is empty
+            Exception: If encoding fails
+        """
+        return QRMatrix.from_modules(self.make_matrix(data))
+    
+    def render(self, modules, fill_color='black', back_color='white', output_format='png'):
+        """
+        Render a module matrix from make_matrix() or make_qr_matrix().
+        
+        Args:
+            modules: 2D boolean matrix or QRMatrix
+            fill_color (str): Color of the QR code boxes
+            back_color (str): Background color
+            output_format (str): Output format, as in generate_qr_code()
             
         Returns:
-            dict: Contains 'success', 'url', 'service', and 'message'
+            BytesIO: Buffer containing the encoded QR code
+            
+        Raises:
+            ValueError: If the output format is unknown
+            Exception: If rendering fails
         """
-        # Service 1: catbox.moe (PERMANENT - Best option!)
+        self._check_output_format(output_format)
+        if isinstance(modules, QRMatrix):
+            if output_format == 'bits':
+                return BytesIO(modules.to_bytes())
+            modules = modules.to_numpy() if np is not None else modules.tolist()
         try:
-            url = self._upload_to_catbox(file_bytes, filename)
-            if url:
-                return {
-                    'success': True,
-                    'url': url,
-                    'service': 'catbox.moe',
-                    'message': '✓ PERMANENT link - Never expires!'
-                }
+            return self._encode_matrix(modules, fill_color, back_color, output_format)
         except Exception as e:
-            print(f"catbox.moe failed: {e}")
+            raise Exception(f"Failed to render QR code: {str(e)}")
+    
+    def generate_sizes(self, data, sizes, fill_color='black', back_color='white',
+                       output_format='png', max_workers=None):
+        """
+        Generate the same QR code at several sizes from a single encode.
+        
+        The data is encoded once and each size is scaled from that matrix
+        by whole pixels per module, so N sizes cost one encode and N
+        rasterizations. Sizes already in the render cache are not rendered
+        again.
+        
+        Args:
+            data (str): The text or URL to encode
+            sizes (iterable): Box sizes (int, with this generator's border)
+                or (box_size, border) pairs, e.g. [2, 10, (40, 8)]
+            fill_color (str): Color of the QR code boxes
+            back_color (str): Background color
+            output_format (str): Output format, as in generate_qr_code()
+            max_workers (int): Threads rendering sizes in parallel (the
+                rasterizer and PNG compression release the GIL); None
+                renders them one after another
+            
+        Returns:
+            dict: (box_size, border) -> BytesIO, in the order given
+            
+        Raises:
+            ValueError: If data is empty, or a size or format is invalid
+            Exception: If QR code generation fails
+        """
+        if not data or not data.strip():
+            raise ValueError("Data cannot be empty")
+        self._check_output_format(output_format)
+        sizes = list(dict.fromkeys(self._check_size(size) for size in sizes))
         
-        # Service 2: pixeldrain.com (90 days for free, permanent with account)
+        results = {}
+        cache_keys = {}
+        for box_size, border in sizes:
+            if self.cache is None:
+                if self.metrics is not None:
+                    self.metrics.count_render(output_format, 'off')
+                continue
+            cache_key = self._cache_key(data, fill_color, back_color, output_format,
+                                        box_size, border)
+            cached = self.cache.get(cache_key)
+            if self.metrics is not None:
+                self.metrics.count_render(output_format, 'miss' if cached is None else 'hit')
+            if cached is None:
+                cache_keys[box_size, border] = cache_key
+            else:
+                results[box_size, border] = BytesIO(cached)
+        
+        missing = [size for size in sizes if size not in results]
+        if missing:
+            def render_size(size):
+                return self._encode_matrix(modules, fill_color, back_color, output_format, *size)
+            
+            try:
+                with self._in_flight('render'):
+                    modules = self.make_qr_matrix(data)
+                    modules = modules.to_numpy() if np is not None else modules.tolist()
+                    if max_workers and len(missing) > 1:
+                        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                            rendered = list(executor.map(render_size, missing))
+                    else:
+                        rendered = [render_size(size) for size in missing]
+            except Exception as e:
+                raise Exception(f"Failed to generate QR code: {str(e)}")
+            
+            for size, buf in zip(missing, rendered):
+                results[size] = buf
+                if size in cache_keys:
+                    self.cache.put(cache_keys[size], buf.getvalue())
+        
+        return {size: results[size] for size in sizes}
+    
+    def _encode_matrix(self, modules, fill_color, back_color, output_format,
+                       box_size=None, border=None):
+        """Stages 3-4: rasterize and save as PNG, or serialize directly."""
+        box_size = self.box_size if box_size is None else box_size
+        border = self.border if border is None else border
+        if output_format == 'png':
+            img = self._stage('make_image', self._render_image, modules, fill_color, back_color,
+                              box_size, border)
+            return self._stage('save', self._save_png, img)
+        return self._stage('serialize', self._serialize, modules, output_format,
+                           fill_color, back_color, box_size, border)
+    
+    # The render pipeline is split into stages so they can be benchmarked
+    # and instrumented individually.
+    
+    def _stage(self, stage, func, *args):
+        """Run one pipeline stage, timing it when metrics are enabled."""
+        if self.metrics is None:
+            return func(*args)
+        start = time.perf_counter()
         try:
-            url = self._upload_to_pixeldrain(file_bytes, filename)
-            if url:
-                return {
-                    'success': True,
-                    'url': url,
-                    'service': 'pixeldrain.com',
-                    'message': '✓ Link available for 90+ days'
-                }
-        except Exception as e:
-            print(f"pixeldrain failed: {e}")
+            return func(*args)
+        finally:
+            self.metrics.observe_stage(stage, time.perf_counter() - start)
+    
+    def _in_flight(self, kind):
+        """Context manager tracking in-flight work when metrics are enabled."""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.in_flight(kind)
+    
+    def _encode_data(self, data):
+        """Stage 1: create the QRCode and encode the payload into segments."""
+        error_correction = ERROR_CORRECTION_LEVELS[self.error_correction]
+        version, segments = 1, None
+        if self.segmentation == 'optimal':
+            version, segments = fit(data, error_correction)
+        
+        qr = qrcode.QRCode(
+            version=version,
+            error_correction=error_correction,
+            box_size=self.box_size,
+            border=self.border,
+            mask_pattern=self.mask_pattern,
+        )
+        if segments is None:
+            qr.add_data(data)
+        else:
+            qr.data_list.extend(segments)
+        return qr
+    
+    def _make_matrix(self, qr):
+        """Stage 2: fit the version, choose the mask and lay out the modules."""
+        if self.segmentation == 'qrcode':
+            qr.best_fit(start=qr.version)
+        if np is None:
+            qr.make(fit=False)
+        else:
+            # Encodes on the cached version template and scores all eight
+            # masks at once; same matrix as qr.make()
+            make_best_mask(qr, self.mask_pattern)
+    
+    def _render_image(self, modules, fill_color, back_color, box_size, border):
+        """Stage 3: rasterize the module matrix into a 1-bit or palette image."""
+        if self.renderer == 'numpy':
+            return rasterize(modules, box_size, border,
+                             fill_color, back_color, palette=True)
+        # Same drawing as QRCode.make_image(), which needs the QRCode itself
+        img = PilImage(border, len(modules), box_size, qrcode_modules=modules,
+                       fill_color=fill_color, back_color=back_color)
+        for r, row in enumerate(modules):
+            for c, dark in enumerate(row):
+                if dark:
+                    img.drawrect(r, c)
+        return to_palette(img.get_image())
+    
+    def _save_png(self, img):
+        """Stage 4: encode the image as PNG."""
+        buf = BytesIO()
+        img.save(buf, format='PNG', **self._png_options())
+        buf.seek(0)
+        return buf
+    
+    def _png_options(self):
+        """Pillow PNG save options for the compression setting."""
+        if isinstance(self.png_compression, int):
+            return {'compress_level': self.png_compression}
+        return PNG_COMPRESSION[self.png_compression]
+    
+    def _serialize(self, modules, output_format, fill_color, back_color, box_size, border):
+        """Stages 3-4 for non-PNG formats: serialize the matrix directly."""
+        return BytesIO(serialize(modules, output_format, box_size,
+                                 border, fill_color, back_color))
+    
+    def generate_batch(self, payloads, fill_color='black', back_color='white',
+                       max_workers=None, chunk_size=64, ordered=True, executor=None,
+                       output_format='png'):
+        """
+        Generate QR codes for many payloads across worker processes.
+        
+        Payloads are consumed lazily and sent to the workers in chunks, with
+        only a few chunks in flight at a time, so arbitrarily long iterables
+        can be streamed.
+        
+        Args:
+            payloads (iterable): Texts or URLs to encode
+            fill_color (str): Color of the QR code boxes
+            back_color (str): Background color
+            max_workers (int): Number of worker processes (defaults to CPU count)
+            chunk_size (int): Payloads sent to a worker per task
+            ordered (bool): Yield results in input order; if False, yield
+                them as soon as each chunk completes
+            executor (ProcessPoolExecutor): Existing pool to use instead of
+                creating (and shutting down) a new one
+            output_format (str): Output format, as in generate_qr_code()
+            
+        Yields:
+            BatchResult: (index, data, image, error) per payload. On failure,
+                image is None and error holds the message; the batch goes on.
+        """
+        self._check_output_format(output_format)
+        settings = self.render_settings(fill_color, back_color, output_format)
+        window = (max_workers or os.cpu_count() or 1) * 2
+        
+        own_executor = executor is None
+        if own_executor:
+            initializer, initargs = worker_initializer()
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                                           initargs=initargs)
         
-        # Service 3: 0x0.st (365 days - 1 year!)
         try:
-            url = self._upload_to_0x0(file_bytes, filename)
-            if url:
-                return {
-                    'success': True,
-                    'url': url,
-                    'service': '0x0.st',
-                    'message': '✓ Link available for 365 days (1 year)'
-                }
-        except Exception as e:
-            print(f"0x0.st failed: {e}")
+            chunks = _iter_chunks(payloads, chunk_size)
+            pending = deque() if ordered else set()
+            
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                future = executor.submit(_render_batch_chunk, settings, chunk)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                return True
+            
+            while len(pending) < window and submit_next():
+                pass
+            
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.difference_update(done)
+                
+                for future in done:
+                    submit_next()
+                    for result in future.result():
+                        if self.metrics is not None:
+                            self.metrics.observe_stages(result.timings)
+                        yield result
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+    
+    def render_settings(self, fill_color='black', back_color='white', output_format='png'):
+        """
+        Get a picklable snapshot of the render settings for worker processes.
+        
+        Returns:
+            dict: Settings understood by the worker-side render helpers
+        """
+        return {
+            'box_size': self.box_size,
+            'border': self.border,
+            'renderer': self.renderer,
+            'error_correction': self.error_correction,
+            'mask_pattern': self.mask_pattern,
+            'png_compression': self.png_compression,
+            'segmentation': self.segmentation,
+            'cache': self.cache is not None,
+            'fill_color': fill_color,
+            'back_color': back_color,
+            'output_format': output_format,
+        }
+    
+    @staticmethod
+    def _check_error_correction(level):
+        """Validate an error correction level name."""
+        if level not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Unknown error correction level: {level}")
+        return level
+    
+    def _check_size(self, size):
+        """Validate a box size or (box_size, border) pair; returns the pair."""
+        box_size, border = (size, self.border) if isinstance(size, int) else tuple(size)
+        for value, minimum in ((box_size, 1), (border, 0)):
+            if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+                raise ValueError(f"Invalid size: {size}")
+        return box_size, border
+    
+    @staticmethod
+    def _check_output_format(output_format):
+        """Validate an output format name."""
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        return output_format
+    
+    @staticmethod
+    def _check_mask_pattern(mask_pattern):
+        """Validate a fixed mask pattern (None means automatic)."""
+        if mask_pattern is not None and mask_pattern not in MASK_PATTERNS:
+            raise ValueError(f"Mask pattern must be 0-7, got: {mask_pattern}")
+        return mask_pattern
+    
+    @staticmethod
+    def _check_png_compression(png_compression):
+        """Validate a PNG compression preset name or zlib level."""
+        if png_compression in PNG_COMPRESSION:
+            return png_compression
+        if isinstance(png_compression, int) and not isinstance(png_compression, bool) \
+                and 0 <= png_compression <= 9:
+            return png_compression
+        raise ValueError(f"Unknown PNG compression: {png_compression}")
+    
+    @staticmethod
+    def _check_segmentation(segmentation):
+        """Validate a segmentation strategy name."""
+        if segmentation not in SEGMENTATIONS:
+            raise ValueError(f"Unknown segmentation: {segmentation}")
+        return segmentation
+    
+    @staticmethod
+    def _check_renderer(renderer):
+        """Validate a renderer name, falling back to the best available one."""
+        if renderer is None:
+            return 'numpy' if np is not None else 'qrcode'
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer: {renderer}")
+        if renderer == 'numpy' and np is None:
+            raise ValueError("The numpy renderer requires NumPy to be installed")
+        return renderer
+    
+    def _cache_key(self, data, fill_color, back_color, output_format='png',
+                   box_size=None, border=None):
+        """Build the render cache key for the current settings (or another size)."""
+        return make_cache_key(
+            data=data,
+            fill_color=fill_color,
+            back_color=back_color,
+            output_format=output_format,
+            box_size=self.box_size if box_size is None else box_size,
+            border=self.border if border is None else border,
+            error_correction=self.error_correction,
+            mask_pattern=self.mask_pattern,
+            png_compression=self.png_compression,
+            segmentation=self.segmentation,
+        )
+    
+    def upload_file_and_get_link(self, file_bytes, filename, hedge_delay=None, deadline=None,
+                                 progress=None):
+        """
+        Upload file to hosting service and get shareable link.
+        Prioritizes services with LONGER expiration times.
         
-        # Service 4: gofile.io (Good for larger files, 10+ days)
+        By default providers are tried strictly one after another. With a
+        hedge delay, the next provider is started in parallel whenever the
+        ones in flight haven't answered within that many seconds, and the
+        most preferred success wins. A deadline bounds the whole chain.
+        
+        The file is streamed to each provider in chunks and rewound for
+        every attempt, so memory use doesn't grow with the file size.
+        
+        Args:
+            file_bytes: The file content as bytes, a memory-mapped file, a
+                path, or a seekable binary file-like object
+            filename (str): Name of the file
+            hedge_delay (float): Seconds before hedging to the next provider
+                (defaults to the generator's hedge_delay)
+            deadline (float): Overall time limit in seconds
+                (defaults to the generator's upload_deadline)
+            progress (callable): Called as progress(service, bytes_sent, total)
+                when a provider attempt starts and as its body is sent. It
+                runs on the uploading thread(s) and must be thread-safe.
+            
+        Returns:
+            dict: Contains 'success', 'url', 'service', and 'message'.
+                Successful results also carry 'cached', True when the link
+                came from the link store instead of a fresh upload.
+        """
+        upload = UploadSource(file_bytes)
         try:
-            url = self._upload_to_gofile(file_bytes, filename)
-            if url:
-                return {
-                    'success': True,
-                    'url': url,
-                    'service': 'gofile.io',
-                    'message': '✓ Link expires after 10 days of inactivity'
-                }
-        except Exception as e:
-            print(f"gofile.io failed: {e}")
+            digest = None
+            if self.link_store is not None:
+                digest = hash_content(upload.reader())
+                stored = self.link_store.lookup(digest)
+                if stored:
+                    if self.metrics is not None:
+                        self.metrics.count_upload('reused')
+                    return self._upload_success(
+                        stored['service'], stored['url'],
+                        PROVIDER_MESSAGES.get(stored['service'], '✓ Link reused'),
+                        cached=True
+                    )
+            
+            with self._in_flight('upload'):
+                result = self._upload_uncached(upload, filename, hedge_delay, deadline, progress)
+            
+            if digest is not None and result['success']:
+                self.link_store.record(digest, upload.size, result['service'], result['url'])
+            return result
+        finally:
+            upload.close()
+    
+    def _upload_uncached(self, upload, filename, hedge_delay, deadline, progress=None):
+        """Upload through the provider chain, sequentially or hedged."""
+        if hedge_delay is None:
+            hedge_delay = self.hedge_delay
+        if deadline is None:
+            deadline = self.upload_deadline
+        
+        providers = self._ranked_providers(upload.size)
+        if not providers:
+            result = self._upload_failure(
+                f'❌ No upload service accepts files of {upload.size / MB:.1f} MB.'
+            )
+        elif hedge_delay is None and deadline is None:
+            result = self._upload_failure()
+            for service, method, message in providers:
+                url = self._try_provider(service, method, upload, filename, progress)
+                if url:
+                    result = self._upload_success(service, url, message)
+                    break
+        else:
+            result = self._upload_hedged(
+                providers, upload, filename, hedge_delay, deadline, progress
+            )
+        
+        if self.metrics is not None:
+            self._count_upload(result, providers)
+        return result
+    
+    def _count_upload(self, result, providers):
+        """Record an upload outcome and how far down the chain it was served."""
+        if result['success']:
+            services = [entry[0] for entry in providers]
+            self.metrics.count_upload('success', services.index(result['service']))
+        else:
+            self.metrics.count_upload('failure')
+    
+    def _ranked_providers(self, size=None):
+        """Get the provider table entries to try for a file size, in ranked order."""
+        by_service = {
+            entry[0]: entry for entry in UPLOAD_PROVIDERS if self.accepts(entry[0], size)
+        }
+        order = self.health.rank(list(by_service))
+        return [by_service[service] for service in order]
+    
+    def accepts(self, service, size=None):
+        """
+        Check whether a provider is configured and takes a file of this size.
         
-        # Service 5: file.io (Backup only - expires after download)
+        Args:
+            service (str): Provider name
+            size (int): File size in bytes (None skips the size check)
+            
+        Returns:
+            bool: True if the provider should be tried
+        """
+        capability = self.capabilities.get(service)
+        if capability is None or not self.endpoints.get(capability['endpoint']):
+            return False
+        max_size = capability['max_size']
+        return size is None or max_size is None or size <= max_size
+    
+    def _try_provider(self, service, method, upload, filename, progress=None):
+        """Run one provider's upload, returning its URL or None on failure."""
+        if not self.health.begin_attempt(service):
+            return None
+        
+        if progress is not None:
+            total = upload.size
+            progress(service, 0, total)
+            upload = ProgressSource(upload, lambda sent: progress(service, sent, total))
+        
+        start = time.monotonic()
+        url = None
         try:
-            url = self._upload_to_fileio(file_bytes, filename)
-            if url:
-                return {
-                    'success': True,
-                    'url': url,
-                    'service': 'file.io',
-                    'message': '⚠️ Link expires after FIRST download or 14 days'
-                }
+            url = getattr(self, method)(upload, filename)
         except Exception as e:
-            print(f"file.io failed: {e}")
+            print(f"{service} failed: {e}")
+        
+        elapsed = time.monotonic() - start
+        self.health.record(service, bool(url), elapsed)
+        if self.metrics is not None:
+            self.metrics.observe_attempt(service, bool(url), elapsed)
+        return url
+    
+    def provider_stats(self):
+        """
+        Get live upload provider health and the most recent ranking.
+        
+        Returns:
+            dict: 'providers' maps each provider to its EWMA latency, success
+                rate, failure counts and circuit state; 'last_ranking' lists
+                the latest ordering decision with scores and skip reasons
+        """
+        return {
+            'ranking': self.health.ranking,
+            'providers': self.health.stats(),
+            'last_ranking': list(self.health.last_ranking),
+        }
+    
+    def _upload_hedged(self, providers, upload, filename, hedge_delay, deadline, progress=None):
+        """
+        Race providers with hedging while respecting the preference order.
+        
+        A success is only accepted once every more-preferred provider has
+        failed, unless the deadline runs out first, in which case the best
+        success seen so far is used. Stragglers are left to finish in the
+        background; their results are ignored here but still recorded in
+        provider health, so a provider that hangs past the deadline counts
+        as failing.
+        """
+        start = time.monotonic()
+        end = start + deadline if deadline is not None else None
+        
+        executor = ThreadPoolExecutor(max_workers=len(providers))
+        pending = {}
+        results = {}
+        next_hedge = None
+        
+        def launch():
+            nonlocal next_hedge
+            rank = len(pending) + len(results)
+            if rank >= len(providers):
+                return
+            service, method, _ = providers[rank]
+            # Stragglers keep reading the source after the caller closes it
+            upload.retain()
+            future = executor.submit(
+                self._try_provider, service, method, upload, filename, progress
+            )
+            future.add_done_callback(lambda _: upload.close())
+            pending[future] = rank
+            if hedge_delay is not None:
+                next_hedge = time.monotonic() + hedge_delay
         
-        # All services failed
+        try:
+            launch()
+            while True:
+                # Accept the best success once everything preferred to it failed
+                for rank in range(len(providers)):
+                    if rank not in results:
+                        break
+                    if results[rank]:
+                        service, _, message = providers[rank]
+                        return self._upload_success(service, results[rank], message)
+                
+                if not pending:
+                    if len(results) >= len(providers):
+                        return self._upload_failure()
+                    launch()
+                    continue
+                
+                now = time.monotonic()
+                timeouts = [t - now for t in (next_hedge, end) if t is not None]
+                timeout = max(0, min(timeouts)) if timeouts else None
+                
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rank = pending.pop(future)
+                    results[rank] = future.result()
+                    if not results[rank]:
+                        launch()
+                
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    successes = sorted(rank for rank, url in results.items() if url)
+                    if successes:
+                        service, _, message = providers[successes[0]]
+                        return self._upload_success(service, results[successes[0]], message)
+                    return self._upload_failure(
+                        f'❌ Upload deadline of {deadline:g}s exceeded. Please try again.'
+                    )
+                
+                if next_hedge is not None and now >= next_hedge:
+                    next_hedge = None
+                    launch()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _upload_success(service, url, message, cached=False):
+        return {
+            'success': True,
+            'url': url,
+            'service': service,
+            'message': message,
+            'cached': cached
+        }
+    
+    @staticmethod
+    def _upload_failure(message=None):
         return {
             'success': False,
             'url': None,
             'service': None,
-            'message': '❌ All upload services failed. Please try again or use Google Drive/Dropbox.'
+            'message': message or '❌ All upload services failed. Please try again or use Google Drive/Dropbox.'
+        }
+    
+    def _session(self, service):
+        """Get the pooled keep-alive session for an upload provider."""
+        with self._sessions_lock:
+            session = self._sessions.get(service)
+            if session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=2,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=self._retry_policy(),
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[service] = session
+            return session
+    
+    def _retry_policy(self):
+        """Build the urllib3 retry policy shared by the provider sessions."""
+        options = {
+            'total': self.max_retries,
+            # A read timeout means the provider may already have the file:
+            # re-sending it would double the wait and risk a duplicate upload
+            'read': 0,
+            'backoff_factor': self.backoff_factor,
+            'status_forcelist': RETRY_STATUSES,
+            'allowed_methods': frozenset(['GET', 'POST']),
+            'raise_on_status': False,
         }
+        try:
+            return Retry(backoff_jitter=self.backoff_factor, **options)
+        except TypeError:
+            # urllib3 < 2.0 has no jitter support
+            return Retry(**options)
     
-    def _upload_to_catbox(self, file_bytes, filename):
+    def _timeout(self, service, read_timeout=None):
+        """Get the (connect, read) timeout pair for a provider request."""
+        if read_timeout is None:
+            read_timeout = self.read_timeout
+        if read_timeout is None:
+            read_timeout = PROVIDER_READ_TIMEOUTS[service]
+        return (self.connect_timeout, read_timeout)
+    
+    def close(self):
+        """Close the pooled upload sessions."""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+    
+    def _upload_to_catbox(self, upload, filename):
         """Upload to catbox.moe - PERMANENT storage!"""
-        files = {'fileToUpload': (filename, file_bytes)}
-        data = {'reqtype': 'fileupload'}
-        response = requests.post('https://catbox.moe/user/api.php', files=files, data=data, timeout=60)
+        body = upload.multipart('fileToUpload', filename, {'reqtype': 'fileupload'})
+        response = self._session('catbox.moe').post(
+            self.endpoints['catbox_upload'], data=body, headers=body.headers,
+            timeout=self._timeout('catbox.moe')
+        )
         
         if response.status_code == 200 and response.text.startswith('https://'):
             return response.text.strip()
         return None
     
-    def _upload_to_pixeldrain(self, file_bytes, filename):
+    def _upload_to_pixeldrain(self, upload, filename):
         """Upload to pixeldrain.com - 90+ days storage."""
-        files = {'file': (filename, file_bytes)}
-        response = requests.post('https://pixeldrain.com/api/file', files=files, timeout=60)
+        body = upload.multipart('file', filename)
+        response = self._session('pixeldrain.com').post(
+            self.endpoints['pixeldrain_upload'], data=body, headers=body.headers,
+            timeout=self._timeout('pixeldrain.com')
+        )
         
         if response.status_code == 201:
             data = response.json()
             file_id = data.get('id')
             if file_id:
-                return f'https://pixeldrain.com/u/{file_id}'
+                return self.endpoints['pixeldrain_link'].format(id=file_id)
         return None
     
-    def _upload_to_0x0(self, file_bytes, filename):
+    def _upload_to_0x0(self, upload, filename):
         """Upload to 0x0.st - 365 days storage."""
-        files = {'file': (filename, file_bytes)}
-        response = requests.post('https://0x0.st', files=files, timeout=30)
+        body = upload.multipart('file', filename)
+        response = self._session('0x0.st').post(
+            self.endpoints['0x0_upload'], data=body, headers=body.headers,
+            timeout=self._timeout('0x0.st')
+        )
         
         if response.status_code == 200:
             return response.text.strip()
         return None
     
-    def _upload_to_gofile(self, file_bytes, filename):
+    def _upload_to_gofile(self, upload, filename):
         """Upload to gofile.io service."""
-        server_response = requests.get('https://api.gofile.io/getServer', timeout=10)
+        session = self._session('gofile.io')
+        server_response = session.get(
+            self.endpoints['gofile_server'],
+            timeout=self._timeout('gofile.io', GOFILE_SERVER_READ_TIMEOUT)
+        )
         if server_response.status_code != 200:
             return None
         
@@ -190,11 +1036,12 @@ class QRCodeGenerator:
         
         server = server_data['data']['server']
         
-        files = {'file': (filename, file_bytes)}
-        upload_response = requests.post(
-            f'https://{server}.gofile.io/uploadFile',
-            files=files,
-            timeout=60
+        body = upload.multipart('file', filename)
+        upload_response = session.post(
+            self.endpoints['gofile_upload'].format(server=server),
+            data=body,
+            headers=body.headers,
+            timeout=self._timeout('gofile.io')
         )
         
         if upload_response.status_code == 200:
@@ -203,10 +1050,13 @@ class QRCodeGenerator:
                 return data['data']['downloadPage']
         return None
     
-    def _upload_to_fileio(self, file_bytes, filename):
+    def _upload_to_fileio(self, upload, filename):
         """Upload to file.io service - BACKUP ONLY."""
-        files = {'file': (filename, file_bytes)}
-        response = requests.post('https://file.io', files=files, timeout=30)
+        body = upload.multipart('file', filename)
+        response = self._session('file.io').post(
+            self.endpoints['fileio_upload'], data=body, headers=body.headers,
+            timeout=self._timeout('file.io')
+        )
         
         if response.status_code == 200:
             data = response.json()
@@ -214,12 +1064,72 @@ class QRCodeGenerator:
                 return data.get('link')
         return None
     
+    def _upload_to_tus(self, upload, filename):
+        """
+        Upload to a tus server in resumable chunks.
+        
+        The file is sent tus_chunk_size bytes per PATCH. When a chunk fails,
+        the server is asked (HEAD) how much it has kept and the upload
+        continues from that offset, up to max_retries times in a row
+        without progress.
+        """
+        session = self._session('tus')
+        timeout = self._timeout('tus')
+        endpoint = self.endpoints['tus_upload']
+        metadata = base64.b64encode(filename.encode('utf-8')).decode('ascii')
+        
+        response = session.post(endpoint, headers={
+            'Tus-Resumable': TUS_VERSION,
+            'Upload-Length': str(upload.size),
+            'Upload-Metadata': f'filename {metadata}',
+        }, timeout=timeout)
+        if response.status_code != 201 or not response.headers.get('Location'):
+            return None
+        location = urljoin(endpoint, response.headers['Location'])
+        
+        offset = 0
+        failures = 0
+        while offset < upload.size:
+            chunk = upload.read_at(offset, self.tus_chunk_size)
+            try:
+                response = session.patch(location, data=chunk, headers={
+                    'Tus-Resumable': TUS_VERSION,
+                    'Upload-Offset': str(offset),
+                    'Content-Type': 'application/offset+octet-stream',
+                }, timeout=timeout)
+                if response.status_code == 204:
+                    offset = int(response.headers['Upload-Offset'])
+                    failures = 0
+                    continue
+                print(f"tus chunk at {offset} failed: HTTP {response.status_code}")
+            except requests.RequestException as e:
+                print(f"tus chunk at {offset} failed: {e}")
+        
+            failures += 1
+            if failures > self.max_retries:
+                return None
+            time.sleep(self.backoff_factor * 2 ** (failures - 1))
+            try:
+                response = session.head(location, headers={'Tus-Resumable': TUS_VERSION},
+                                        timeout=timeout)
+            except requests.RequestException as e:
+                print(f"tus offset check failed: {e}")
+                continue
+            if response.status_code in (404, 410):
+                # The server dropped the upload; it can't be resumed
+                return None
+            if response.status_code == 200:
+                offset = int(response.headers['Upload-Offset'])
+        
+        return location
+        
     def generate_qr_from_file(self, file_bytes, filename, fill_color='black', back_color='white'):
         """
         Upload any file and generate QR code from the link.
         
         Args:
-            file_bytes (bytes): File content
+            file_bytes: File content as bytes, a memory-mapped file, a path,
+                or a seekable binary file-like object
             filename (str): File name (with extension)
             fill_color (str): QR code color
             back_color (str): Background color
@@ -240,12 +1150,25 @@ class QRCodeGenerator:
         
         return qr_image, upload_result
     
-    def update_settings(self, box_size=None, border=None):
+    def update_settings(self, box_size=None, border=None, renderer=None,
+                        error_correction=None, mask_pattern=False, png_compression=None,
+                        segmentation=None):
         """Update the generator settings."""
         if box_size is not None:
             self.box_size = box_size
         if border is not None:
             self.border = border
+        if renderer is not None:
+            self.renderer = self._check_renderer(renderer)
+        if error_correction is not None:
+            self.error_correction = self._check_error_correction(error_correction)
+        if mask_pattern is not False:
+            # None is meaningful here (back to automatic mask selection)
+            self.mask_pattern = self._check_mask_pattern(mask_pattern)
+        if png_compression is not None:
+            self.png_compression = self._check_png_compression(png_compression)
+        if segmentation is not None:
+            self.segmentation = self._check_segmentation(segmentation)
     
     def save_to_file(self, qr_buffer, filename='qr_code.png'):
         """Save QR code buffer to a file."""
@@ -256,10 +1179,67 @@ class QRCodeGenerator:
 
 
 def create_qr_code(data, box_size=10, border=4, 
-                   fill_color='black', back_color='white'):
+                   fill_color='black', back_color='white', cache=True,
+                   output_format='png'):
     """Quick function to generate QR from text."""
-    generator = QRCodeGenerator(box_size=box_size, border=border)
-    return generator.generate_qr_code(data, fill_color, back_color)
+    generator = QRCodeGenerator(box_size=box_size, border=border, cache=cache)
+    return generator.generate_qr_code(data, fill_color, back_color, output_format)
+
+
+def _iter_chunks(payloads, chunk_size):
+    """Group payloads into lists of (index, data) pairs."""
+    chunk = []
+    for index, data in enumerate(payloads):
+        chunk.append((index, data))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _render_batch_chunk(settings, chunk, metrics=None):
+    """
+    Worker entry point for generate_batch() and the render pools.
+    
+    Render stage timings go straight to metrics when it is given (a thread
+    shares the caller's registry); otherwise, as in a worker process, they
+    are returned in each result's timings.
+    """
+    def record_stage(kind, name, value, labels):
+        if name != 'qr_render_stage_seconds':
+            return
+        if metrics is not None:
+            metrics.observe_stage(labels['stage'], value)
+        else:
+            timings.append((labels['stage'], value))
+    
+    generator = QRCodeGenerator(
+        box_size=settings['box_size'],
+        border=settings['border'],
+        cache=settings['cache'],
+        renderer=settings['renderer'],
+        error_correction=settings['error_correction'],
+        mask_pattern=settings['mask_pattern'],
+        png_compression=settings['png_compression'],
+        segmentation=settings['segmentation'],
+        metrics=Metrics(hooks=[record_stage]),
+    )
+    
+    results = []
+    for index, data in chunk:
+        timings = []
+        try:
+            buf = generator.generate_qr_code(
+                data,
+                fill_color=settings['fill_color'],
+                back_color=settings['back_color'],
+                output_format=settings['output_format'],
+            )
+            results.append(BatchResult(index, data, buf.getvalue(), None, tuple(timings)))
+        except Exception as e:
+            results.append(BatchResult(index, data, None, str(e), tuple(timings)))
+    return results
 
 
 if __name__ == "__main__":
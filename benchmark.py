@@ -0,0 +1,355 @@
+"""
+QR Code Rendering Benchmark
+Sweeps payload size, error correction level, box size/border, colors,
+renderer and output format through QRCodeGenerator's render stages and
+reports per-stage latency percentiles, throughput and peak memory as JSON.
+
+Usage:
+    python benchmark.py -o before.json
+    python benchmark.py --quick -o after.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import PIL
+import qrcode
+from qrcode import util
+
+from backend import ERROR_CORRECTION_LEVELS, QRCodeGenerator, RENDERERS
+from rasterizer import np
+from serializers import OUTPUT_FORMATS
+
+STAGES = ('encode', 'make', 'make_image', 'save')
+
+COLOR_SCHEMES = {
+    'bw': ('black', 'white'),
+    'custom': ('#8b5cf6', '#111827'),
+}
+
+DEFAULT_SWEEP = {
+    'payloads': ['url', '100', '500', '1000', 'max'],
+    'ecc': ['L', 'M', 'Q', 'H'],
+    'sizes': ['10x4', '1x0'],
+    'colors': ['bw', 'custom'],
+    'renderers': list(RENDERERS) if np is not None else ['qrcode'],
+    'formats': list(OUTPUT_FORMATS),
+}
+
+QUICK_SWEEP = {
+    'payloads': ['url', 'max'],
+    'ecc': ['L', 'H'],
+    'sizes': ['10x4'],
+    'colors': ['bw'],
+    'renderers': DEFAULT_SWEEP['renderers'][:1],
+    'formats': ['png'],
+}
+
+
+def max_payload_length(ecc):
+    """Largest byte-mode payload that still fits a version 40 symbol."""
+    bits = util.BIT_LIMIT_TABLE[ERROR_CORRECTION_LEVELS[ecc]][40]
+    # 4-bit mode indicator and 16-bit length field for byte mode
+    return (bits - 4 - 16) // 8
+
+
+def make_payload(spec, ecc, seed=0):
+    """
+    Build a deterministic URL-like payload.
+
+    Args:
+        spec (str): 'url' for a short URL, 'max' for ~95% of the version 40
+            capacity at this ECC level, or a length in characters
+        ecc (str): Error correction level
+        seed (int): Random seed
+
+    Returns:
+        str: The payload
+    """
+    prefix = 'https://example.com/'
+    if spec == 'url':
+        length = len(prefix) + 8
+    elif spec == 'max':
+        length = int(max_payload_length(ecc) * 0.95)
+    else:
+        length = int(spec)
+
+    rng = random.Random(f'{seed}-{length}')
+    alphabet = string.ascii_letters + string.digits
+    tail = ''.join(rng.choice(alphabet) for _ in range(max(0, length - len(prefix))))
+    return (prefix + tail)[:length]
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of a list of numbers."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_stages(generator, data, fill_color, back_color, output_format, timer):
+    """
+    Run the render pipeline once, timing each stage.
+
+    Args:
+        generator (QRCodeGenerator): Generator with the settings under test
+        data (str): Payload
+        fill_color, back_color: Colors
+        output_format (str): Output format
+        timer (callable): Called as timer(stage, seconds)
+
+    Returns:
+        tuple: (QR version, output size in bytes)
+    """
+    start = time.perf_counter()
+    qr = generator._encode_data(data)
+    now = time.perf_counter()
+    timer('encode', now - start)
+
+    start = now
+    generator._make_matrix(qr)
+    now = time.perf_counter()
+    timer('make', now - start)
+
+    if output_format == 'png':
+        start = now
+        img = generator._render_image(qr.modules, fill_color, back_color,
+                                       generator.box_size, generator.border)
+        now = time.perf_counter()
+        timer('make_image', now - start)
+
+        start = now
+        buf = generator._save_png(img)
+    else:
+        # Vector and raw formats skip rasterization entirely
+        timer('make_image', 0.0)
+        start = now
+        buf = generator._serialize(qr.modules, output_format, fill_color, back_color,
+                                   generator.box_size, generator.border)
+    timer('save', time.perf_counter() - start)
+
+    return qr.version, len(buf.getvalue())
+
+
+def measure_memory(generator, data, fill_color, back_color, output_format):
+    """Peak traced Python-heap growth (KiB) of each stage, from one run."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        baseline = [0]
+
+        def timer(stage, _seconds):
+            current, peak = tracemalloc.get_traced_memory()
+            peaks[stage] = (peak - baseline[0]) / 1024
+            tracemalloc.reset_peak()
+            baseline[0] = current
+
+        baseline[0] = tracemalloc.get_traced_memory()[0]
+        run_stages(generator, data, fill_color, back_color, output_format, timer)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def bench_config(config, iterations, warmup):
+    """Benchmark one configuration and return its result record."""
+    box_size, border = (int(v) for v in config['size'].split('x'))
+    fill_color, back_color = COLOR_SCHEMES[config['colors']]
+    generator = QRCodeGenerator(
+        box_size=box_size,
+        border=border,
+        cache=False,
+        renderer=config['renderer'],
+        error_correction=config['ecc'],
+    )
+    data = make_payload(config['payload'], config['ecc'])
+    args = (generator, data, fill_color, back_color, config['format'])
+
+    samples = {stage: [] for stage in STAGES}
+    totals = []
+
+    def record(stage, seconds):
+        samples[stage].append(seconds)
+
+    for _ in range(warmup):
+        run_stages(*args, timer=lambda stage, seconds: None)
+
+    gc.collect()
+    version = size = None
+    for _ in range(iterations):
+        before = {stage: len(samples[stage]) for stage in STAGES}
+        version, size = run_stages(*args, timer=record)
+        totals.append(sum(samples[stage][before[stage]] for stage in STAGES))
+
+    peaks = measure_memory(*args)
+
+    stages = {}
+    for stage in STAGES:
+        stages[stage] = {
+            'p50_ms': percentile(samples[stage], 50) * 1000,
+            'p99_ms': percentile(samples[stage], 99) * 1000,
+            'mean_ms': sum(samples[stage]) / len(samples[stage]) * 1000,
+            'peak_kib': peaks.get(stage, 0.0),
+        }
+
+    mean_total = sum(totals) / len(totals)
+    return {
+        'config': dict(config, payload_length=len(data)),
+        'qr_version': version,
+        'output_bytes': size,
+        'stages': stages,
+        'total': {
+            'p50_ms': percentile(totals, 50) * 1000,
+            'p99_ms': percentile(totals, 99) * 1000,
+            'mean_ms': mean_total * 1000,
+        },
+        'codes_per_s': 1.0 / mean_total if mean_total else 0.0,
+    }
+
+
+def environment():
+    """Describe the machine and library versions for the results file."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'qrcode': getattr(qrcode, '__version__', None) or _dist_version('qrcode'),
+        'pillow': PIL.__version__,
+        'numpy': np.__version__ if np is not None else None,
+    }
+
+
+def _dist_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def config_key(config):
+    """Stable identity of a configuration, for comparing result files."""
+    return json.dumps({k: v for k, v in config.items() if k != 'payload_length'},
+                      sort_keys=True)
+
+
+def compare(base_path, new_path, threshold):
+    """
+    Print per-configuration p50 changes between two result files.
+
+    Returns:
+        int: 1 if any configuration regressed by more than threshold
+    """
+    with open(base_path) as f:
+        base = {config_key(r['config']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+
+    regressed = False
+    print(f"{'configuration':<70} {'base p50':>10} {'new p50':>10} {'change':>8}")
+    for result in new:
+        key = config_key(result['config'])
+        if key not in base:
+            continue
+        old_ms = base[key]['total']['p50_ms']
+        new_ms = result['total']['p50_ms']
+        change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️ regression'
+            regressed = True
+        label = ' '.join(f'{k}={v}' for k, v in sorted(result['config'].items())
+                         if k != 'payload_length')
+        print(f"{label:<70} {old_ms:>9.2f}ms {new_ms:>9.2f}ms {change:>+7.1%}{flag}")
+    return 1 if regressed else 0
+
+
+def build_parser():
+    """Build the command-line argument parser."""
+    parser = argparse.ArgumentParser(description="Benchmark QR code rendering.")
+    parser.add_argument('-o', '--output', help="Write JSON results to this file")
+    parser.add_argument('--quick', action='store_true', help="Run a small sweep")
+    parser.add_argument('--iterations', type=int, default=30, help="Timed runs per configuration")
+    parser.add_argument('--warmup', type=int, default=3, help="Untimed runs per configuration")
+    parser.add_argument('--payloads', help="Comma-separated: url, max or lengths")
+    parser.add_argument('--ecc', help="Comma-separated ECC levels (L,M,Q,H)")
+    parser.add_argument('--sizes', help="Comma-separated BOXxBORDER pairs, e.g. 10x4,1x0")
+    parser.add_argument('--colors', help=f"Comma-separated: {','.join(COLOR_SCHEMES)}")
+    parser.add_argument('--renderers', help=f"Comma-separated: {','.join(RENDERERS)}")
+    parser.add_argument('--formats', help=f"Comma-separated: {','.join(OUTPUT_FORMATS)}")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help="Compare two result files instead of benchmarking")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative p50 slowdown reported as a regression")
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    sweep = dict(QUICK_SWEEP if args.quick else DEFAULT_SWEEP)
+    for axis in sweep:
+        value = getattr(args, axis)
+        if value:
+            sweep[axis] = value.split(',')
+
+    results = []
+    for payload, ecc, size, colors, renderer, output_format in itertools.product(
+        sweep['payloads'], sweep['ecc'], sweep['sizes'],
+        sweep['colors'], sweep['renderers'], sweep['formats'],
+    ):
+        config = {
+            'payload': payload,
+            'ecc': ecc,
+            'size': size,
+            'colors': colors,
+            'renderer': renderer,
+            'format': output_format,
+        }
+        result = bench_config(config, args.iterations, args.warmup)
+        results.append(result)
+        print(
+            f"{payload:>5} ecc={ecc} size={size:<5} colors={colors:<6} "
+            f"renderer={renderer:<6} format={output_format:<4} v{result['qr_version']:<3} "
+            f"p50={result['total']['p50_ms']:8.2f}ms p99={result['total']['p99_ms']:8.2f}ms "
+            f"{result['codes_per_s']:8.1f} codes/s",
+            file=sys.stderr,
+        )
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
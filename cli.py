@@ -0,0 +1,351 @@
+"""
+QR Code Bulk Generation CLI
+Renders payloads from CSV/JSONL/stdin across worker processes and streams
+the PNGs into a ZIP or TAR archive, or a directory.
+
+Usage:
+    python cli.py urls.csv -o codes.zip --column url
+    python cli.py payloads.jsonl -o codes.tar.gz --workers 8
+    cat urls.txt | python cli.py -o codes/
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import tarfile
+import tempfile
+import time
+import zlib
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from backend import PNG_COMPRESSION, SEGMENTATIONS, QRCodeGenerator
+
+
+def detect_input_format(path):
+    """Guess the input format from a file name."""
+    lowered = path.lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'lines'
+
+
+def detect_output_format(path):
+    """Guess the output format from a file or directory name."""
+    lowered = path.lower()
+    if lowered.endswith('.zip'):
+        return 'zip'
+    if lowered.endswith(('.tar', '.tar.gz', '.tgz')):
+        return 'tar'
+    return 'dir'
+
+
+def read_payloads(stream, input_format, column='data', name_column=None):
+    """
+    Lazily read (name, data) pairs from an input stream.
+
+    Args:
+        stream: Text stream to read from
+        input_format (str): 'csv', 'jsonl' or 'lines'
+        column (str): CSV column / JSON field holding the payload
+        name_column (str): CSV column / JSON field holding the output name
+
+    Yields:
+        tuple: (name or None, data)
+    """
+    if input_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield (row.get(name_column) if name_column else None), row.get(column, '')
+    elif input_format == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                name = record.get(name_column) if name_column else None
+                yield name, _json_text(record.get(column))
+            else:
+                yield None, _json_text(record)
+    else:
+        for line in stream:
+            line = line.rstrip('\r\n')
+            if line:
+                yield None, line
+
+
+def _json_text(value):
+    """Payload text for a JSON value: strings as-is, null as empty, others as JSON."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ZipStreamWriter:
+    """
+    Minimal streaming ZIP writer (stored entries, ZIP64 aware).
+
+    zipfile.ZipFile keeps a ZipInfo object per entry until close(), which
+    grows without bound on million-row jobs. This writer spools the central
+    directory records to a temporary file instead, so memory stays flat.
+    """
+
+    def __init__(self, path):
+        self._out = open(path, 'wb')
+        self._central = tempfile.TemporaryFile()
+        self._count = 0
+        self._date, self._time = self._dos_timestamp(time.localtime())
+
+    @staticmethod
+    def _dos_timestamp(t):
+        date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+        dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+        return date, dos_time
+
+    def write(self, name, data):
+        """Append a file to the archive."""
+        encoded = name.encode('utf-8')
+        crc = zlib.crc32(data)
+        size = len(data)
+        offset = self._out.tell()
+
+        self._out.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 20, 0x0800, 0, self._time, self._date,
+            crc, size, size, len(encoded), 0,
+        ))
+        self._out.write(encoded)
+        self._out.write(data)
+
+        extra = b''
+        version = 20
+        if offset >= 0xFFFFFFFF:
+            extra = struct.pack('<HHQ', 0x0001, 8, offset)
+            offset = 0xFFFFFFFF
+            version = 45
+
+        self._central.write(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, 0x0800,
+            0, self._time, self._date, crc, size, size, len(encoded), len(extra),
+            0, 0, 0, 0o100644 << 16, offset,
+        ))
+        self._central.write(encoded)
+        self._central.write(extra)
+        self._count += 1
+
+    def close(self):
+        """Write the central directory and close the archive."""
+        cd_offset = self._out.tell()
+        self._central.seek(0)
+        while True:
+            block = self._central.read(1024 * 1024)
+            if not block:
+                break
+            self._out.write(block)
+        self._central.close()
+        cd_size = self._out.tell() - cd_offset
+
+        count = self._count
+        if count >= 0xFFFF or cd_offset >= 0xFFFFFFFF or cd_size >= 0xFFFFFFFF:
+            zip64_offset = self._out.tell()
+            self._out.write(struct.pack(
+                '<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                count, count, cd_size, cd_offset,
+            ))
+            self._out.write(struct.pack('<IIQI', 0x07064b50, 0, zip64_offset, 1))
+            count = min(count, 0xFFFF)
+            cd_size = min(cd_size, 0xFFFFFFFF)
+            cd_offset = min(cd_offset, 0xFFFFFFFF)
+
+        self._out.write(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, count, count, cd_size, cd_offset, 0,
+        ))
+        self._out.close()
+
+
+class TarStreamWriter:
+    """Streaming TAR writer that doesn't accumulate member metadata."""
+
+    def __init__(self, path):
+        mode = 'w:gz' if path.lower().endswith(('.gz', '.tgz')) else 'w'
+        self._tar = tarfile.open(path, mode)
+        self._mtime = time.time()
+
+    def write(self, name, data):
+        """Append a file to the archive."""
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self._mtime
+        self._tar.addfile(info, io.BytesIO(data))
+        # TarFile remembers every member it wrote; nothing reads them back
+        self._tar.members.clear()
+
+    def close(self):
+        """Finish and close the archive."""
+        self._tar.close()
+
+
+class DirectoryWriter:
+    """Writes each PNG as its own file in a directory."""
+
+    def __init__(self, path):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        """Write a single file."""
+        with open(os.path.join(self._path, name), 'wb') as f:
+            f.write(data)
+
+    def close(self):
+        """Nothing to finalize for directories."""
+
+
+WRITERS = {
+    'zip': ZipStreamWriter,
+    'tar': TarStreamWriter,
+    'dir': DirectoryWriter,
+}
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of this process and its workers.
+
+    Returns:
+        tuple: (main process MB, largest worker MB), or (None, None)
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    main = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return main, workers
+
+
+def output_name(name, index):
+    """Turn an optional user-supplied name into a safe archive entry name."""
+    if not name:
+        return f'{index:08d}.png'
+    name = os.path.basename(str(name).strip()) or f'{index:08d}'
+    if not name.lower().endswith('.png'):
+        name += '.png'
+    return name
+
+
+def run(args):
+    """Render every payload and write it to the chosen output."""
+    if args.input in (None, '-'):
+        stream = sys.stdin
+        input_format = args.input_format or 'lines'
+    else:
+        stream = open(args.input, newline='', encoding='utf-8')
+        input_format = args.input_format or detect_input_format(args.input)
+
+    output_format = args.output_format or detect_output_format(args.output)
+    writer = WRITERS[output_format](args.output)
+
+    # Names of payloads currently in flight, popped as soon as they're written
+    names = {}
+
+    def payloads():
+        for index, (name, data) in enumerate(
+            read_payloads(stream, input_format, args.column, args.name_column)
+        ):
+            names[index] = name
+            yield data
+
+    generator = QRCodeGenerator(box_size=args.box_size, border=args.border, cache=False,
+                                mask_pattern=args.mask, png_compression=args.compression,
+                                segmentation=args.segmentation)
+    written = failed = 0
+    start = time.perf_counter()
+
+    try:
+        for result in generator.generate_batch(
+            payloads(),
+            fill_color=args.fg,
+            back_color=args.bg,
+            max_workers=args.workers,
+            chunk_size=args.chunk_size,
+        ):
+            name = names.pop(result.index, None)
+            if result.error:
+                failed += 1
+                print(f"row {result.index}: {result.error}", file=sys.stderr)
+                continue
+            writer.write(output_name(name, result.index), result.image)
+            written += 1
+    finally:
+        writer.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else 0.0
+    main_rss, worker_rss = peak_rss_mb()
+
+    print(f"✓ Wrote {written} QR codes to {args.output} ({output_format})", file=sys.stderr)
+    if failed:
+        print(f"⚠️ {failed} payloads failed", file=sys.stderr)
+    print(f"Elapsed: {elapsed:.2f}s • Throughput: {rate:.1f} codes/s", file=sys.stderr)
+    if main_rss is not None:
+        print(f"Peak RSS: {main_rss:.1f} MB (main), {worker_rss:.1f} MB (largest worker)",
+              file=sys.stderr)
+
+    return 1 if failed and not written else 0
+
+
+def build_parser():
+    """Build the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Bulk-generate QR codes into a ZIP/TAR archive or a directory."
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help="CSV/JSONL/text file with payloads ('-' for stdin)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Output .zip, .tar, .tar.gz or directory")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl', 'lines'],
+                        help="Input format (guessed from the file name by default)")
+    parser.add_argument('--output-format', choices=sorted(WRITERS),
+                        help="Output format (guessed from the output name by default)")
+    parser.add_argument('--column', default='data',
+                        help="CSV column / JSON field holding the payload")
+    parser.add_argument('--name-column',
+                        help="CSV column / JSON field holding the output file name")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (defaults to CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help="Payloads sent to a worker per task")
+    parser.add_argument('--box-size', type=int, default=10, help="Pixels per module")
+    parser.add_argument('--border', type=int, default=4, help="Border width in modules")
+    parser.add_argument('--mask', type=int, choices=range(8), default=None,
+                        help="Use this fixed mask pattern instead of searching all eight")
+    parser.add_argument('--compression', choices=sorted(PNG_COMPRESSION), default='default',
+                        help="PNG compression preset")
+    parser.add_argument('--segmentation', choices=SEGMENTATIONS, default='optimal',
+                        help="Encode with the fewest-bit mixed-mode segments or qrcode's own")
+    parser.add_argument('--fg', default='black', help="QR code color")
+    parser.add_argument('--bg', default='white', help="Background color")
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Fake Upload Providers
+Local stand-in HTTP server that mimics the API shape of every upload
+provider (catbox.moe, pixeldrain.com, 0x0.st, gofile.io, file.io) and of a
+tus resumable upload server, with injectable latency, error rates, hangs
+and size limits, for load and failover testing.
+
+Usage:
+    with FakeProviderServer() as server:
+        server.set_behavior('catbox.moe', error_rate=1.0)
+        generator = QRCodeGenerator(endpoints=server.endpoints)
+        generator.upload_file_and_get_link(b'...', 'file.bin')
+
+    # The tus server is only used when its endpoint is passed as well
+    QRCodeGenerator(endpoints=dict(server.endpoints, tus_upload=server.tus_url))
+"""
+
+import json
+import random
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROVIDERS = ('catbox.moe', 'pixeldrain.com', '0x0.st', 'gofile.io', 'file.io', 'tus')
+
+
+class ProviderBehavior:
+    """How a fake provider responds."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, hang_rate=0.0,
+                 hang_time=60.0, error_status=503, max_size=None):
+        """
+        Args:
+            latency (float): Seconds added to every response
+            jitter (float): Extra uniformly random seconds (0..jitter)
+            error_rate (float): Probability of answering with error_status
+            hang_rate (float): Probability of not answering for hang_time
+            hang_time (float): Seconds a hanging request stalls
+            error_status (int): HTTP status used for injected errors
+            max_size (int): Larger request bodies are rejected with 413
+                after being received, as real providers do
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_time = hang_time
+        self.error_status = error_status
+        self.max_size = max_size
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        ('POST', re.compile(r'^/catbox/user/api\.php$'), 'catbox.moe', '_catbox'),
+        ('POST', re.compile(r'^/pixeldrain/api/file$'), 'pixeldrain.com', '_pixeldrain'),
+        ('POST', re.compile(r'^/0x0/?$'), '0x0.st', '_0x0'),
+        ('GET', re.compile(r'^/gofile/getServer$'), 'gofile.io', '_gofile_server'),
+        ('POST', re.compile(r'^/gofile/(?P<server>[\w-]+)/uploadFile$'), 'gofile.io', '_gofile_upload'),
+        ('POST', re.compile(r'^/fileio/?$'), 'file.io', '_fileio'),
+        ('POST', re.compile(r'^/tus/files/?$'), 'tus', '_tus_create'),
+        ('HEAD', re.compile(r'^/tus/files/(?P<upload_id>\w+)$'), 'tus', '_tus_offset'),
+        ('PATCH', re.compile(r'^/tus/files/(?P<upload_id>\w+)$'), 'tus', '_tus_append'),
+    ]
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        for route_method, pattern, provider, handler in self.ROUTES:
+            match = pattern.match(self.path)
+            if route_method == method and match:
+                break
+        else:
+            self._drain_body()
+            self._send(404, b'not found', 'text/plain')
+            return
+
+        fake = self.server.fake
+        size = self._body_size = self._drain_body()
+        fake._count(provider, 'requests')
+        behavior = fake.behaviors[provider]
+
+        if random.random() < behavior.hang_rate:
+            fake._count(provider, 'hangs')
+            fake._stopped.wait(behavior.hang_time)
+            self.close_connection = True
+            return
+
+        fake._stopped.wait(behavior.latency + random.uniform(0, behavior.jitter))
+
+        if random.random() < behavior.error_rate:
+            fake._count(provider, 'errors')
+            self._send(behavior.error_status, b'injected failure', 'text/plain')
+            return
+
+        if behavior.max_size is not None and size > behavior.max_size:
+            fake._count(provider, 'errors')
+            self._send(413, b'file too large', 'text/plain')
+            return
+
+        fake._count(provider, 'bytes', size)
+        getattr(self, handler)(**match.groupdict())
+
+    def _drain_body(self):
+        """Read and discard the request body, returning its size."""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            total = 0
+            while True:
+                length = int(self.rfile.readline().split(b';')[0], 16)
+                if length == 0:
+                    self.rfile.readline()
+                    return total
+                total += len(self.rfile.read(length))
+                self.rfile.readline()
+
+        remaining = int(self.headers.get('Content-Length') or 0)
+        total = remaining
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return total - remaining
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def _catbox(self):
+        self._send(200, f'https://files.catbox.moe/{uuid.uuid4().hex[:6]}.bin'.encode(), 'text/plain')
+
+    def _pixeldrain(self):
+        self._send_json(201, {'success': True, 'id': uuid.uuid4().hex[:8]})
+
+    def _0x0(self):
+        self._send(200, f'https://0x0.st/{uuid.uuid4().hex[:4]}.bin\n'.encode(), 'text/plain')
+
+    def _gofile_server(self):
+        self._send_json(200, {'status': 'ok', 'data': {'server': 'store1'}})
+
+    def _gofile_upload(self, server):
+        self._send_json(200, {
+            'status': 'ok',
+            'data': {'downloadPage': f'https://gofile.io/d/{uuid.uuid4().hex[:6]}'},
+        })
+
+    def _fileio(self):
+        self._send_json(200, {'success': True, 'link': f'https://file.io/{uuid.uuid4().hex[:12]}'})
+
+    def _tus_create(self):
+        upload_id = self.server.fake._tus_create(int(self.headers.get('Upload-Length', 0)))
+        self._send(201, b'', 'text/plain', {
+            'Tus-Resumable': '1.0.0',
+            'Location': f'/tus/files/{upload_id}',
+        })
+
+    def _tus_offset(self, upload_id):
+        upload = self.server.fake._tus_uploads.get(upload_id)
+        if upload is None:
+            self._send(404, b'', 'text/plain')
+            return
+        self._send(200, b'', 'text/plain', {
+            'Tus-Resumable': '1.0.0',
+            'Upload-Offset': str(upload['offset']),
+            'Upload-Length': str(upload['length']),
+            'Cache-Control': 'no-store',
+        })
+
+    def _tus_append(self, upload_id):
+        offset = int(self.headers.get('Upload-Offset', -1))
+        new_offset = self.server.fake._tus_append(upload_id, offset, self._body_size)
+        if new_offset is None:
+            self._send(409, b'offset mismatch', 'text/plain')
+            return
+        self._send(204, b'', 'text/plain', {
+            'Tus-Resumable': '1.0.0',
+            'Upload-Offset': str(new_offset),
+        })
+
+
+class FakeProviderServer:
+    """Threaded local HTTP server hosting every fake provider."""
+
+    def __init__(self, host='127.0.0.1', port=0, behaviors=None):
+        """
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind (0 picks a free one)
+            behaviors (dict): Provider name -> ProviderBehavior
+        """
+        self.behaviors = {provider: ProviderBehavior() for provider in PROVIDERS}
+        self.behaviors.update(behaviors or {})
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._tus_uploads = {}
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoints(self):
+        """Endpoint overrides for QRCodeGenerator(endpoints=...)."""
+        base = self.base_url
+        return {
+            'catbox_upload': f'{base}/catbox/user/api.php',
+            'pixeldrain_upload': f'{base}/pixeldrain/api/file',
+            '0x0_upload': f'{base}/0x0/',
+            'gofile_server': f'{base}/gofile/getServer',
+            'gofile_upload': f'{base}/gofile/{{server}}/uploadFile',
+            'fileio_upload': f'{base}/fileio/',
+        }
+
+    @property
+    def tus_url(self):
+        """Creation URL of the fake tus server (endpoints['tus_upload'])."""
+        return f'{self.base_url}/tus/files/'
+
+    def set_behavior(self, provider, **options):
+        """Replace a provider's behavior (see ProviderBehavior for options)."""
+        self.behaviors[provider] = ProviderBehavior(**options)
+
+    def reset(self):
+        """Restore default behaviors and clear the statistics."""
+        self.behaviors = {provider: ProviderBehavior() for provider in PROVIDERS}
+        with self._stats_lock:
+            self._stats.clear()
+            self._tus_uploads.clear()
+
+    def stats(self):
+        """
+        Get request counters.
+
+        Returns:
+            dict: Provider -> {'requests', 'errors', 'hangs', 'bytes'}
+        """
+        with self._stats_lock:
+            return {provider: dict(counts) for provider, counts in self._stats.items()}
+
+    def _count(self, provider, counter, amount=1):
+        with self._stats_lock:
+            counts = self._stats.setdefault(
+                provider, {'requests': 0, 'errors': 0, 'hangs': 0, 'bytes': 0}
+            )
+            counts[counter] += amount
+
+    def _tus_create(self, length):
+        upload_id = uuid.uuid4().hex
+        with self._stats_lock:
+            self._tus_uploads[upload_id] = {'length': length, 'offset': 0}
+        return upload_id
+
+    def _tus_append(self, upload_id, offset, size):
+        """Accept a chunk at offset, returning the new offset (None on mismatch)."""
+        with self._stats_lock:
+            upload = self._tus_uploads.get(upload_id)
+            if upload is None or upload['offset'] != offset:
+                return None
+            upload['offset'] = min(upload['length'], offset + size)
+            return upload['offset']
+
+    def start(self):
+        """Serve in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release hanging requests."""
+        self._stopped.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake upload providers.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+
+    server = FakeProviderServer(args.host, args.port).start()
+    print(json.dumps(dict(server.endpoints, tus_upload=server.tus_url), indent=2))
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
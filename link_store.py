@@ -0,0 +1,154 @@
+"""
+Upload Link Store
+Persistent SQLite store of uploaded file links keyed by content hash, so
+unchanged files aren't uploaded again while their link is still valid
+"""
+
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DAY = 24 * 60 * 60
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# How long each provider keeps a link: (rule name, lifetime in seconds).
+# A lifetime of None means permanent, 0 means the link can't be reused.
+RETENTION_RULES = {
+    'catbox.moe': ('permanent', None),
+    '0x0.st': ('365 days', 365 * DAY),
+    'pixeldrain.com': ('90 days', 90 * DAY),
+    # Expires after 10 days without downloads. We can't see downloads, so
+    # count from the upload to stay on the safe side.
+    'gofile.io': ('10 days inactive', 10 * DAY),
+    'file.io': ('single download', 0),
+    # Self-hosted: retention is up to whoever runs the server
+    'tus': ('self-hosted', None),
+}
+
+
+def hash_content(file_bytes, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Compute the SHA-256 of file content incrementally.
+
+    Args:
+        file_bytes: File content as a bytes-like object, or a binary
+            file-like object read from its current position to the end
+        chunk_size (int): Bytes fed to the hash per step
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if hasattr(file_bytes, 'read'):
+        for chunk in iter(lambda: file_bytes.read(chunk_size), b''):
+            digest.update(chunk)
+    else:
+        view = memoryview(file_bytes).cast('B')
+        for offset in range(0, len(view), chunk_size):
+            digest.update(view[offset:offset + chunk_size])
+    return digest.hexdigest()
+
+
+class LinkStore:
+    """SQLite-backed map from content hash to still-valid upload links."""
+
+    def __init__(self, path='upload_links.db'):
+        """
+        Open (and create if needed) the link store.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS links (
+                    sha256 TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    retention TEXT NOT NULL,
+                    uploaded_at REAL NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (sha256, service)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection, committing on success."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, sha256, now=None):
+        """
+        Find a still-valid link for some content.
+
+        Args:
+            sha256 (str): Hex digest of the file content
+            now (float): Current UNIX time (defaults to time.time())
+
+        Returns:
+            dict: 'url', 'service', 'retention', 'uploaded_at' and
+                'expires_at' of the longest-lived valid link, or None
+        """
+        if now is None:
+            now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT url, service, retention, uploaded_at, expires_at
+                FROM links
+                WHERE sha256 = ? AND (expires_at IS NULL OR expires_at > ?)
+                ORDER BY expires_at IS NULL DESC, expires_at DESC
+                LIMIT 1
+            """, (sha256, now)).fetchone()
+
+        if row is None:
+            return None
+        return dict(zip(('url', 'service', 'retention', 'uploaded_at', 'expires_at'), row))
+
+    def record(self, sha256, size, service, url, now=None):
+        """
+        Remember a successful upload.
+
+        Args:
+            sha256 (str): Hex digest of the file content
+            size (int): File size in bytes
+            service (str): Provider that returned the link
+            url (str): Shareable link
+            now (float): Upload time as UNIX time (defaults to time.time())
+        """
+        if now is None:
+            now = time.time()
+        retention, lifetime = RETENTION_RULES.get(service, ('unknown', 0))
+        expires_at = None if lifetime is None else now + lifetime
+
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO links
+                    (sha256, service, url, size, retention, uploaded_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (sha256, service, url, size, retention, now, expires_at))
+
+    def purge_expired(self, now=None):
+        """
+        Delete links that can no longer be reused.
+
+        Returns:
+            int: Number of rows removed
+        """
+        if now is None:
+            now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'DELETE FROM links WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                (now,)
+            )
+            return cursor.rowcount
@@ -0,0 +1,164 @@
+"""
+Upload Load Harness
+Drives concurrent uploads through QRCodeGenerator's provider fallback chain
+against the local fake providers and reports end-to-end latency
+distributions per failure scenario and upload mode.
+
+Usage:
+    python load_test.py
+    python load_test.py --scenarios healthy,catbox-hang --concurrency 32 -o load.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import QRCodeGenerator
+from benchmark import percentile
+from fake_providers import FakeProviderServer
+
+# Scenario name -> provider behaviors applied to the fake server
+SCENARIOS = {
+    'healthy': {
+        provider: {'latency': 0.02, 'jitter': 0.02}
+        for provider in ('catbox.moe', 'pixeldrain.com', '0x0.st', 'gofile.io', 'file.io')
+    },
+    'catbox-errors': {
+        'catbox.moe': {'error_rate': 1.0},
+    },
+    'catbox-slow': {
+        'catbox.moe': {'latency': 1.5, 'jitter': 0.5},
+    },
+    'catbox-hang': {
+        'catbox.moe': {'hang_rate': 1.0},
+    },
+    'flaky-chain': {
+        'catbox.moe': {'hang_rate': 0.3, 'error_rate': 0.3},
+        'pixeldrain.com': {'error_rate': 0.5, 'latency': 0.2},
+        '0x0.st': {'latency': 0.5, 'jitter': 0.5},
+    },
+    'all-down': {
+        provider: {'error_rate': 1.0}
+        for provider in ('catbox.moe', 'pixeldrain.com', '0x0.st', 'gofile.io', 'file.io')
+    },
+}
+
+MODES = {
+    'sequential': {},
+    'hedged': {'hedge_delay': 0.25, 'upload_deadline': 10},
+}
+
+
+def run_scenario(server, scenario, mode, requests_count, concurrency, payload, read_timeout):
+    """
+    Run one scenario/mode combination.
+
+    Returns:
+        dict: Latency percentiles, success rate and chosen-provider counts
+    """
+    server.reset()
+    for provider, behavior in SCENARIOS[scenario].items():
+        server.set_behavior(provider, hang_time=read_timeout * 4, **behavior)
+
+    generator = QRCodeGenerator(
+        cache=False,
+        endpoints=server.endpoints,
+        read_timeout=read_timeout,
+        connect_timeout=read_timeout,
+        max_retries=1,
+        backoff_factor=0.05,
+        pool_maxsize=concurrency,
+        **MODES[mode]
+    )
+
+    def one_upload(index):
+        start = time.perf_counter()
+        result = generator.upload_file_and_get_link(payload, f'load-{index}.bin')
+        return time.perf_counter() - start, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one_upload, range(requests_count)))
+    wall = time.perf_counter() - started
+    generator.close()
+
+    latencies = [latency for latency, _ in outcomes]
+    services = Counter(result['service'] or 'failed' for _, result in outcomes)
+    successes = sum(1 for _, result in outcomes if result['success'])
+
+    return {
+        'scenario': scenario,
+        'mode': mode,
+        'requests': requests_count,
+        'concurrency': concurrency,
+        'payload_bytes': len(payload),
+        'success_rate': successes / requests_count,
+        'throughput_per_s': requests_count / wall if wall else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000,
+            'p90': percentile(latencies, 90) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000,
+        },
+        'services': dict(services),
+        'provider_requests': server.stats(),
+        'circuits': {
+            service: stats['state']
+            for service, stats in generator.provider_stats()['providers'].items()
+        },
+    }
+
+
+def build_parser():
+    """Build the command-line argument parser."""
+    parser = argparse.ArgumentParser(description="Load-test the upload fallback chain.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated: {','.join(SCENARIOS)}")
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"Comma-separated: {','.join(MODES)}")
+    parser.add_argument('--requests', type=int, default=100, help="Uploads per scenario")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent uploads")
+    parser.add_argument('--size', type=int, default=64 * 1024, help="Payload size in bytes")
+    parser.add_argument('--read-timeout', type=float, default=2.0,
+                        help="Provider read timeout in seconds (bounds hangs)")
+    parser.add_argument('-o', '--output', help="Write JSON results to this file")
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    payload = os.urandom(args.size)
+    results = []
+
+    with FakeProviderServer() as server:
+        for scenario in args.scenarios.split(','):
+            for mode in args.modes.split(','):
+                result = run_scenario(
+                    server, scenario, mode, args.requests,
+                    args.concurrency, payload, args.read_timeout,
+                )
+                results.append(result)
+                latency = result['latency_ms']
+                print(
+                    f"{scenario:<14} {mode:<10} ok={result['success_rate']:6.1%} "
+                    f"p50={latency['p50']:8.1f}ms p90={latency['p90']:8.1f}ms "
+                    f"p99={latency['p99']:8.1f}ms max={latency['max']:8.1f}ms "
+                    f"services={result['services']}",
+                    file=sys.stderr,
+                )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
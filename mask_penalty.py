@@ -0,0 +1,151 @@
+"""
+QR Code Mask Selection
+Vectorized NumPy scoring of all eight mask patterns at once, choosing the
+same mask as qrcode's pure-Python best_mask_pattern()
+"""
+
+from functools import lru_cache
+
+from qrcode import util
+
+from qr_tables import finish, template, unmasked_matrix
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+MASK_PATTERNS = tuple(range(8))
+
+# Finder-like 1:1:3:1:1 patterns with a 4-module light area (penalty rule 3)
+FINDER_PATTERNS = (
+    (1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0),
+    (0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1),
+)
+
+
+@lru_cache(maxsize=None)
+def mask_grids(size):
+    """
+    Evaluate every mask function over a size x size symbol.
+
+    Returns:
+        ndarray: Boolean array of shape (8, size, size), True where the
+            mask inverts a data module
+    """
+    i, j = np.indices((size, size))
+    # Evaluated through qrcode's own mask functions (once per size) so the
+    # masks can never drift from the library's
+    grids = np.stack([
+        np.frompyfunc(util.mask_func(pattern), 2, 1)(i, j).astype(bool)
+        for pattern in MASK_PATTERNS
+    ])
+    grids.setflags(write=False)
+    return grids
+
+
+def _run_penalty(stack):
+    """Rule 1: N - 2 points for each row/column run of 5+ same-color modules."""
+    count, size = stack.shape[:2]
+    points = np.zeros(count, dtype=np.int64)
+    for lines in (stack, stack.transpose(0, 2, 1)):
+        edges = np.ones((count, size, size + 1), dtype=bool)
+        np.not_equal(lines[:, :, 1:], lines[:, :, :-1], out=edges[:, :, 1:-1])
+        starts = np.flatnonzero(edges)
+        lengths = np.diff(starts)
+        # Gaps across a line boundary have length 1 and never score
+        scoring = lengths >= 5
+        owners = starts[:-1][scoring] // (size * (size + 1))
+        points += np.bincount(owners, weights=lengths[scoring] - 2,
+                              minlength=count).astype(np.int64)
+    return points
+
+
+def _block_penalty(stack):
+    """Rule 2: 3 points for each 2x2 block of one color."""
+    top_left = stack[:, :-1, :-1]
+    uniform = (
+        (top_left == stack[:, 1:, :-1])
+        & (top_left == stack[:, :-1, 1:])
+        & (top_left == stack[:, 1:, 1:])
+    )
+    return 3 * uniform.sum(axis=(1, 2))
+
+
+def _finder_penalty(stack):
+    """Rule 3: 40 points for each finder-like pattern in a row or column."""
+    size = stack.shape[1]
+    windows = size - 10
+    points = 0
+    for lines in (stack, stack.transpose(0, 2, 1)):
+        for pattern in FINDER_PATTERNS:
+            match = np.ones(stack.shape[:2] + (windows,), dtype=bool)
+            for offset, dark in enumerate(pattern):
+                segment = lines[:, :, offset:offset + windows]
+                match &= segment if dark else ~segment
+            points = points + 40 * match.sum(axis=(1, 2))
+    return points
+
+
+def _balance_penalty(stack):
+    """Rule 4: 10 points per 5% the dark-module ratio departs from 50%."""
+    modules = stack.shape[1] ** 2
+    dark_counts = stack.sum(axis=(1, 2))
+    # Same float arithmetic as qrcode so the truncation agrees exactly
+    return np.array([
+        int(abs(float(dark) / modules * 100 - 50) / 5) * 10
+        for dark in dark_counts.tolist()
+    ])
+
+
+def penalty_scores(stack):
+    """
+    Score masked symbols with the four ISO/IEC 18004 penalty rules.
+
+    Args:
+        stack (ndarray): Boolean array of shape (masks, size, size)
+
+    Returns:
+        ndarray: Penalty per symbol (lower is better), equal to
+            qrcode.util.lost_point() for each one
+    """
+    return (
+        _run_penalty(stack)
+        + _block_penalty(stack)
+        + _finder_penalty(stack)
+        + _balance_penalty(stack)
+    )
+
+
+def make_best_mask(qr, pattern=None):
+    """
+    Lay out a fitted QRCode with the lowest-penalty mask.
+
+    Equivalent to QRCode.make(fit=False), but the data is encoded and
+    placed once on the cached version template (see qr_tables) and all
+    eight masks are derived from it and scored together.
+
+    Args:
+        qr (QRCode): QR code whose version is already fitted
+        pattern (int): Fixed mask pattern to apply instead of searching
+
+    Returns:
+        int: The applied mask pattern
+    """
+    version = qr.version
+    size = version * 4 + 17
+    # Format and version bits stay light while scoring, as in qrcode
+    unmasked = unmasked_matrix(version, qr.error_correction, qr.data_list)
+    _, region, _, _ = template(version)
+    grids = mask_grids(size)
+
+    if pattern is None:
+        candidates = unmasked ^ (region & grids)
+        pattern = int(np.argmin(penalty_scores(candidates)))
+        modules = candidates[pattern]
+    else:
+        modules = unmasked ^ (region & grids[pattern])
+
+    qr.modules_count = size
+    qr.modules = finish(modules, version, qr.error_correction, pattern).tolist()
+    return pattern
@@ -0,0 +1,260 @@
+"""
+QR Code Metrics
+In-process counters, gauges and histograms for rendering and uploads,
+exported in the Prometheus text format, with hooks for custom collectors
+"""
+
+import bisect
+import math
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bucket upper bounds in seconds
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+UPLOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class _Metric:
+    """A metric family: one value (or histogram) per label combination."""
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def _notify(self, value, labels):
+        self.registry._notify(self.kind, self.name, value, labels)
+
+    def samples(self):
+        """Yield (suffix, labels, value) for the text exposition."""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', key, value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._notify(amount, labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. work in flight."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        self._notify(value, labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            value = self._values[key] = self._values.get(key, 0) + amount
+        self._notify(value, labels)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+        self._notify(value, labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count))
+                           for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield '_bucket', key + (('le', _format_value(float(bound))),), cumulative
+            yield '_sum', key, total
+            yield '_count', key, count
+
+
+class Metrics:
+    """
+    Registry of metric families.
+
+    Besides the generic counter()/gauge()/histogram() accessors it has
+    helpers for the metrics QRCodeGenerator reports. Hooks registered with
+    add_hook() are called as hook(kind, name, value, labels) on every
+    update, e.g. to forward observations to another collector.
+    """
+
+    def __init__(self, hooks=None):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._hooks = list(hooks or [])
+
+    def add_hook(self, hook):
+        """Register a callable invoked on every metric update."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def _notify(self, kind, name, value, labels):
+        for hook in self._hooks:
+            try:
+                hook(kind, name, value, labels)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+    def _get(self, cls, name, documentation, labelnames, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=RENDER_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        """
+        Export every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text (serve it with CONTENT_TYPE)
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # Helpers for the metrics reported by the generators
+
+    def observe_stage(self, stage, seconds):
+        """Record the duration of one render stage."""
+        self.histogram(
+            'qr_render_stage_seconds', 'Time spent in each render stage.', ('stage',)
+        ).observe(seconds, stage=stage)
+
+    def observe_stages(self, timings):
+        """Record (stage, seconds) pairs timed in a worker process."""
+        for stage, seconds in timings:
+            self.observe_stage(stage, seconds)
+
+    def count_render(self, output_format, cache):
+        """Count a render request by format and cache result ('hit', 'miss', 'off')."""
+        self.counter(
+            'qr_renders_total', 'QR code render requests.', ('format', 'cache')
+        ).inc(format=output_format, cache=cache)
+
+    def observe_attempt(self, provider, success, seconds):
+        """Record one upload provider attempt."""
+        outcome = 'success' if success else 'failure'
+        self.histogram(
+            'qr_upload_attempt_seconds', 'Duration of each upload provider attempt.',
+            ('provider', 'outcome'), UPLOAD_BUCKETS
+        ).observe(seconds, provider=provider, outcome=outcome)
+        self.counter(
+            'qr_upload_attempts_total', 'Upload provider attempts.', ('provider', 'outcome')
+        ).inc(provider=provider, outcome=outcome)
+
+    def count_upload(self, outcome, depth=None):
+        """
+        Count a finished upload.
+
+        Args:
+            outcome (str): 'success', 'failure' or 'reused' (link store hit)
+            depth (int): Position of the serving provider in the ranked
+                chain (0 means the first choice served it)
+        """
+        self.counter(
+            'qr_uploads_total', 'Finished uploads by outcome and fallback depth.',
+            ('outcome', 'depth')
+        ).inc(outcome=outcome, depth='' if depth is None else depth)
+
+    @contextmanager
+    def in_flight(self, kind):
+        """Track work in progress in the qr_in_flight gauge."""
+        gauge = self.gauge('qr_in_flight', 'Work currently in progress.', ('kind',))
+        gauge.inc(kind=kind)
+        try:
+            yield
+        finally:
+            gauge.dec(kind=kind)
+
+
+default_metrics = Metrics()
@@ -0,0 +1,231 @@
+"""
+Upload Provider Health
+Live latency/success tracking, circuit breakers and adaptive ranking for
+the upload provider chain
+"""
+
+import math
+import threading
+import time
+
+from link_store import RETENTION_RULES
+
+RANKING_MODES = ('longevity', 'adaptive')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Lifetime credited to permanent links when scoring longevity
+PERMANENT_DAYS = 10 * 365
+
+
+class ProviderHealth:
+    """Rolling health statistics for one upload provider."""
+
+    def __init__(self, service):
+        self.service = service
+        self.ewma_latency = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure = None
+        self.opened_at = None
+        self.state = CLOSED
+        self.probing = False
+
+    @property
+    def success_rate(self):
+        """Fraction of successful attempts (1.0 before any attempt)."""
+        attempts = self.successes + self.failures
+        return self.successes / attempts if attempts else 1.0
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'ewma_latency': self.ewma_latency,
+            'success_rate': self.success_rate,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_failure': self.last_failure,
+        }
+
+
+class HealthTracker:
+    """
+    Tracks provider health and decides which providers to try, in what order.
+
+    A provider's circuit opens after failure_threshold consecutive failures.
+    While open it is skipped; once the cooldown has passed a single
+    half-open probe is let through, which closes the circuit on success and
+    re-opens it on failure. When every circuit is open, rank() moves them
+    all to half-open at once, so an upload still probes each provider.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=300, alpha=0.3,
+                 ranking='longevity', latency_weight=0.05, clock=time.monotonic):
+        """
+        Initialize the tracker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open a circuit
+            cooldown (float): Seconds an open circuit waits before a probe
+            alpha (float): EWMA smoothing factor for latency
+            ranking (str): 'longevity' keeps the fixed preference order,
+                'adaptive' trades link lifetime against observed latency
+            latency_weight (float): Score lost per second of EWMA latency
+                in adaptive mode
+            clock (callable): Monotonic time source
+        """
+        if ranking not in RANKING_MODES:
+            raise ValueError(f"Unknown ranking mode: {ranking}")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.ranking = ranking
+        self.latency_weight = latency_weight
+        self._clock = clock
+        self._providers = {}
+        self._lock = threading.Lock()
+        self.last_ranking = []
+
+    def _get(self, service):
+        health = self._providers.get(service)
+        if health is None:
+            health = self._providers[service] = ProviderHealth(service)
+        return health
+
+    def _refresh(self, health):
+        """Move an open circuit to half-open once its cooldown has passed."""
+        if health.state == OPEN and self._clock() - health.opened_at >= self.cooldown:
+            health.state = HALF_OPEN
+            health.probing = False
+
+    def longevity_score(self, service):
+        """Score in [0, 1] for how long a provider keeps links."""
+        _, lifetime = RETENTION_RULES.get(service, ('unknown', 0))
+        days = PERMANENT_DAYS if lifetime is None else lifetime / 86400
+        return math.log1p(days) / math.log1p(PERMANENT_DAYS)
+
+    def score(self, service):
+        """Adaptive ranking score: longevity minus latency and failure penalties."""
+        health = self._get(service)
+        latency = health.ewma_latency or 0.0
+        return (
+            self.longevity_score(service)
+            - self.latency_weight * latency
+            - (1.0 - health.success_rate)
+        )
+
+    def rank(self, services):
+        """
+        Order providers for an upload, skipping those with an open circuit.
+
+        Every decision is kept in last_ranking for inspection.
+
+        Args:
+            services (list): Provider names in preference order
+
+        Returns:
+            list: Provider names to try, best first
+        """
+        with self._lock:
+            decisions = []
+            for position, service in enumerate(services):
+                health = self._get(service)
+                self._refresh(health)
+                decisions.append({
+                    'service': service,
+                    'position': position,
+                    'state': health.state,
+                    'score': self.score(service),
+                    'ewma_latency': health.ewma_latency,
+                    'success_rate': health.success_rate,
+                    'skipped': health.state == OPEN,
+                })
+
+            if self.ranking == 'adaptive':
+                decisions.sort(key=lambda d: d['score'], reverse=True)
+
+            chosen = [d['service'] for d in decisions if not d['skipped']]
+            if not chosen:
+                # Every circuit is open: trying beats failing without a
+                # request, so each provider gets its half-open probe early
+                for d in decisions:
+                    health = self._get(d['service'])
+                    health.state = HALF_OPEN
+                    health.probing = False
+                    d['state'] = HALF_OPEN
+                    d['skipped'] = False
+                chosen = [d['service'] for d in decisions]
+
+            self.last_ranking = decisions
+            return chosen
+
+    def begin_attempt(self, service):
+        """
+        Check whether an attempt may start now, claiming the probe slot of
+        a half-open circuit.
+
+        Returns:
+            bool: False if the circuit is open or a probe is already running
+        """
+        with self._lock:
+            health = self._get(service)
+            self._refresh(health)
+            if health.state == OPEN:
+                return False
+            if health.state == HALF_OPEN:
+                if health.probing:
+                    return False
+                health.probing = True
+            return True
+
+    def abandon_attempt(self, service):
+        """Release an attempt that ended without a result (e.g. cancelled)."""
+        with self._lock:
+            self._get(service).probing = False
+
+    def record(self, service, success, latency):
+        """
+        Record the outcome of an attempt.
+
+        Args:
+            service (str): Provider name
+            success (bool): Whether a link was returned
+            latency (float): Seconds the attempt took
+        """
+        with self._lock:
+            health = self._get(service)
+            if health.ewma_latency is None:
+                health.ewma_latency = latency
+            else:
+                health.ewma_latency += self.alpha * (latency - health.ewma_latency)
+
+            health.probing = False
+            if success:
+                health.successes += 1
+                health.consecutive_failures = 0
+                health.state = CLOSED
+                health.opened_at = None
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                health.last_failure = time.time()
+                if (health.state == HALF_OPEN
+                        or health.consecutive_failures >= self.failure_threshold):
+                    health.state = OPEN
+                    health.opened_at = self._clock()
+
+    def stats(self):
+        """
+        Get a snapshot of every provider's health.
+
+        Returns:
+            dict: Provider name -> statistics
+        """
+        with self._lock:
+            for health in self._providers.values():
+                self._refresh(health)
+            return {service: health.as_dict() for service, health in self._providers.items()}
@@ -0,0 +1,143 @@
+"""
+QR Code Matrix
+Compact, immutable bit-packed QR module matrix that can be hashed, pickled
+and rendered in any output format without re-encoding
+"""
+
+from serializers import BITS_HEADER_SIZE, pack_bits, unpack_bits
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+class QRMatrix:
+    """
+    Square module matrix stored one bit per module.
+
+    Modules are packed row by row, most significant bit first, with only
+    the final byte zero-padded: the body of the serializers.pack_bits()
+    layout. A version 40 matrix takes under 4 KB instead of the ~250 KB
+    of a list of lists of bools.
+
+    Matrices compare and hash by content, so they work as dict and cache
+    keys, and pickle as just their size and bytes.
+    """
+
+    __slots__ = ('_size', '_packed')
+
+    def __init__(self, size, packed):
+        """
+        Wrap packed modules.
+
+        Args:
+            size (int): Modules per side
+            packed (bytes): size * size bits, row-major, MSB first
+
+        Raises:
+            ValueError: If packed has the wrong length for size
+        """
+        packed = bytes(packed)
+        if size < 0 or len(packed) != (size * size + 7) // 8:
+            raise ValueError(f"{len(packed)} bytes cannot hold a {size}x{size} matrix")
+        self._size = size
+        self._packed = packed
+
+    @property
+    def size(self):
+        """Modules per side."""
+        return self._size
+
+    @classmethod
+    def from_modules(cls, modules):
+        """
+        Pack a module matrix.
+
+        Args:
+            modules: Square 2D boolean matrix (list of lists or NumPy array)
+
+        Returns:
+            QRMatrix: The packed matrix
+        """
+        size = len(modules)
+        if np is not None:
+            return cls(size, np.packbits(np.asarray(modules, dtype=bool)).tobytes())
+        return cls(size, pack_bits(modules)[BITS_HEADER_SIZE:])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a matrix from serializers.pack_bits() output (the 'bits' format).
+
+        Raises:
+            ValueError: If the data is truncated or has trailing bytes
+        """
+        size = int.from_bytes(data[:BITS_HEADER_SIZE], 'big')
+        return cls(size, data[BITS_HEADER_SIZE:])
+
+    def to_bytes(self):
+        """Serialize in the serializers.pack_bits() layout (the 'bits' format)."""
+        return self.size.to_bytes(BITS_HEADER_SIZE, 'big') + self._packed
+
+    @property
+    def packed(self):
+        """The packed modules, without the size header."""
+        return self._packed
+
+    @property
+    def version(self):
+        """QR version the matrix size corresponds to."""
+        return (self.size - 17) // 4
+
+    def to_numpy(self):
+        """
+        Unpack into a NumPy array.
+
+        Returns:
+            ndarray: Read-only (size, size) bool array (True is dark)
+        """
+        bits = np.unpackbits(np.frombuffer(self._packed, dtype=np.uint8),
+                             count=self.size * self.size)
+        array = bits.view(bool).reshape(self.size, self.size)
+        array.setflags(write=False)
+        return array
+
+    def tolist(self):
+        """Unpack into module rows as lists of booleans, like QRCode.modules."""
+        if np is not None:
+            return self.to_numpy().tolist()
+        return unpack_bits(self.to_bytes())
+
+    def memoryview(self):
+        """Read-only, zero-copy view of the packed modules."""
+        return memoryview(self._packed)
+
+    def __buffer__(self, flags):
+        # Buffer protocol for Python 3.12+; memoryview() works everywhere
+        return memoryview(self._packed)
+
+    def __getitem__(self, position):
+        """Module at (row, col) as a bool."""
+        row, col = position
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise IndexError(f"Module {position} outside a {self.size}x{self.size} matrix")
+        index = row * self.size + col
+        return bool(self._packed[index >> 3] & (0x80 >> (index & 7)))
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if not isinstance(other, QRMatrix):
+            return NotImplemented
+        return self.size == other.size and self._packed == other._packed
+
+    def __hash__(self):
+        return hash((self.size, self._packed))
+
+    def __reduce__(self):
+        return (QRMatrix, (self.size, self._packed))
+
+    def __repr__(self):
+        return f'QRMatrix(version={self.version}, size={self.size})'
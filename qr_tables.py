@@ -0,0 +1,379 @@
+"""
+QR Code Tables
+Lazily built, process-wide GF(256)/Reed-Solomon tables and per-version
+matrix templates for a NumPy encoder that matches qrcode's output
+"""
+
+import multiprocessing
+import threading
+from itertools import groupby
+
+import qrcode
+from qrcode import LUT, base, util
+from qrcode.exceptions import DataOverflowError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+class TableStore:
+    """
+    Process-wide store of lazily built tables.
+
+    Entries are read-only NumPy arrays and tuples, built on first use and
+    shared by every thread. snapshot() and install() hand the entries built
+    so far to worker processes (see worker_initializer()).
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, build):
+        """
+        Get an entry, building it on first use.
+
+        Args:
+            kind (str): Table family, e.g. 'template'
+            key: Hashable key within the family
+            build (callable): Called as build(key) to create a missing entry
+
+        Returns:
+            The stored entry
+        """
+        entry = self._tables.get((kind, key))
+        if entry is None:
+            # Built outside the lock: a duplicate build is harmless and
+            # cheaper than serializing every first use
+            entry = build(key)
+            with self._lock:
+                entry = self._tables.setdefault((kind, key), entry)
+        return entry
+
+    def snapshot(self):
+        """Get the entries built so far (picklable)."""
+        with self._lock:
+            return dict(self._tables)
+
+    def install(self, tables):
+        """Add entries from another process's snapshot()."""
+        with self._lock:
+            for key, entry in tables.items():
+                self._tables.setdefault(key, entry)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def warm(self, versions=range(1, 41), error_corrections=(0, 1, 2, 3)):
+        """Build the templates and Reed-Solomon tables for the given versions up front."""
+        if np is None:
+            return
+        for version in versions:
+            template(version)
+            version_overlay(version)
+            for error_correction in error_corrections:
+                block_layout(version, error_correction)
+                for pattern in range(8):
+                    format_overlay(version, error_correction, pattern)
+
+
+default_tables = TableStore()
+
+
+def install(tables):
+    """Install a snapshot into this process's default store."""
+    default_tables.install(tables)
+
+
+def worker_initializer():
+    """
+    Get (initializer, initargs) for a ProcessPoolExecutor, so workers start
+    with the tables the parent has already built.
+
+    Forked workers inherit the parent's store as is, so the snapshot is
+    only sent to workers started with spawn or forkserver.
+    """
+    if multiprocessing.get_start_method() == 'fork':
+        return None, ()
+    return install, (default_tables.snapshot(),)
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+# GF(256) arithmetic, with qrcode's tables as the source of truth
+
+def gf_tables():
+    """
+    Get the GF(256) antilog and log tables.
+
+    Returns:
+        tuple: (exp, log) arrays; exp has 512 entries so products of two
+            logs never need a modulo
+    """
+    def build(_):
+        exp = np.array([base.gexp(i) for i in range(512)], dtype=np.uint8)
+        log = np.zeros(256, dtype=np.int32)
+        log[1:] = [base.glog(i) for i in range(1, 256)]
+        return _frozen(exp), _frozen(log)
+    return default_tables.get('gf', None, build)
+
+
+def generator_polynomial(ec_count):
+    """Reed-Solomon generator polynomial coefficients, highest degree first."""
+    def build(ec_count):
+        if ec_count in LUT.rsPoly_LUT:
+            return tuple(LUT.rsPoly_LUT[ec_count])
+        poly = base.Polynomial([1], 0)
+        for i in range(ec_count):
+            poly = poly * base.Polynomial([1, base.gexp(i)], 0)
+        return tuple(poly)
+    return default_tables.get('generator', ec_count, build)
+
+
+def generator_table(ec_count):
+    """
+    Products of every byte value with the generator's lower coefficients.
+
+    Returns:
+        ndarray: uint8 array of shape (256, ec_count); row f is the value
+            XORed into the remainder register when f is shifted out
+    """
+    def build(ec_count):
+        exp, log = gf_tables()
+        coefficients = np.array(generator_polynomial(ec_count)[1:], dtype=np.int32)
+        factors = np.arange(256)
+        table = exp[log[factors][:, None] + log[coefficients][None, :]]
+        table[0] = 0
+        table[:, coefficients == 0] = 0
+        return _frozen(table)
+    return default_tables.get('generator_table', ec_count, build)
+
+
+def block_layout(version, error_correction):
+    """
+    Reed-Solomon block structure of a version and level.
+
+    Returns:
+        tuple: (data_counts, ec_count, order) where order maps the output
+            codeword positions to indices in the concatenated per-block
+            data and error-correction bytes (qrcode's interleaving)
+    """
+    def build(key):
+        blocks = base.rs_blocks(*key)
+        data_counts = tuple(block.data_count for block in blocks)
+        ec_count = blocks[0].total_count - blocks[0].data_count
+        data_total = sum(data_counts)
+
+        data_starts = np.cumsum((0,) + data_counts[:-1])
+        order = []
+        for i in range(max(data_counts)):
+            order.extend(start + i for start, count in zip(data_starts, data_counts) if i < count)
+        for i in range(ec_count):
+            order.extend(data_total + block * ec_count + i for block in range(len(blocks)))
+        return data_counts, ec_count, _frozen(np.array(order, dtype=np.int32))
+    return default_tables.get('blocks', (version, error_correction), build)
+
+
+def reed_solomon(data, ec_count):
+    """
+    Compute error-correction codewords for equally sized blocks at once.
+
+    Args:
+        data (ndarray): uint8 array of shape (blocks, data_count)
+        ec_count (int): Error-correction codewords per block
+
+    Returns:
+        ndarray: uint8 array of shape (blocks, ec_count)
+    """
+    table = generator_table(ec_count)
+    remainder = np.zeros((data.shape[0], ec_count), dtype=np.uint8)
+    for column in data.T:
+        factor = column ^ remainder[:, 0]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= table[factor]
+    return remainder
+
+
+def codewords(version, error_correction, data_list):
+    """
+    Encode segments into the final interleaved codeword sequence.
+
+    Equivalent to qrcode.util.create_data(), with table-driven
+    Reed-Solomon encoding vectorized across blocks.
+
+    Args:
+        version (int): QR version
+        error_correction (int): qrcode ERROR_CORRECT_* constant
+        data_list (list): QRData segments
+
+    Returns:
+        ndarray: uint8 codewords in placement order
+    """
+    data_counts, ec_count, order = block_layout(version, error_correction)
+    bit_limit = sum(data_counts) * 8
+
+    buffer = util.BitBuffer()
+    for data in data_list:
+        buffer.put(data.mode, 4)
+        buffer.put(len(data), util.length_in_bits(data.mode, version))
+        data.write(buffer)
+    if len(buffer) > bit_limit:
+        raise DataOverflowError(
+            f"Code length overflow. Data size ({len(buffer)}) > size available ({bit_limit})"
+        )
+    # Terminator, then zero bits up to a byte boundary (BitBuffer stores
+    # whole bytes, so the partial byte is already zero-padded)
+    used = min(len(buffer) + 4, bit_limit)
+    byte_count = (used + 7) // 8
+
+    data_bytes = np.zeros(sum(data_counts), dtype=np.uint8)
+    written = buffer.buffer[:byte_count]
+    data_bytes[:len(written)] = written
+    data_bytes[byte_count:] = np.resize(
+        np.array((util.PAD0, util.PAD1), dtype=np.uint8), len(data_bytes) - byte_count
+    )
+
+    ec_bytes = []
+    start = 0
+    # Blocks come in at most two runs of equal sizes, each encoded in one pass
+    for count, run in groupby(data_counts):
+        blocks = len(list(run))
+        group = data_bytes[start:start + blocks * count].reshape(blocks, count)
+        ec_bytes.append(reed_solomon(group, ec_count).ravel())
+        start += blocks * count
+    return np.concatenate([data_bytes] + ec_bytes)[order]
+
+
+# Matrix templates
+
+def _blank(version):
+    """A QRCode holding only the function patterns of a version."""
+    qr = qrcode.QRCode(version=version)
+    size = qr.modules_count = version * 4 + 17
+    qr.modules = [[None] * size for _ in range(size)]
+    qr.setup_position_probe_pattern(0, 0)
+    qr.setup_position_probe_pattern(size - 7, 0)
+    qr.setup_position_probe_pattern(0, size - 7)
+    qr.setup_position_adjust_pattern()
+    qr.setup_timing_pattern()
+    return qr
+
+
+def _placement_path(region):
+    """Data module coordinates in qrcode's map_data() order."""
+    size = len(region)
+    rows, cols = [], []
+    row, step = size - 1, -1
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while True:
+            for c in (col, col - 1):
+                if region[row][c]:
+                    rows.append(row)
+                    cols.append(c)
+            row += step
+            if row < 0 or row >= size:
+                row -= step
+                step = -step
+                break
+    return np.array(rows, dtype=np.int16), np.array(cols, dtype=np.int16)
+
+
+def template(version):
+    """
+    Base matrix of a version, as laid out for mask scoring.
+
+    Returns:
+        tuple: (modules, region, rows, cols): the function patterns with
+            format and version information left light (bool array), the
+            data region mask, and the data module coordinates in
+            placement order
+    """
+    def build(version):
+        qr = _blank(version)
+        # Test layout, as qrcode scores masks: reserved bits stay light
+        qr.setup_type_info(True, 0)
+        if version >= 7:
+            qr.setup_type_number(True)
+        region = np.array([[module is None for module in row] for row in qr.modules])
+        modules = np.array([[bool(module) for module in row] for row in qr.modules])
+        rows, cols = _placement_path(region.tolist())
+        return _frozen(modules), _frozen(region), _frozen(rows), _frozen(cols)
+    return default_tables.get('template', version, build)
+
+
+def _overlay(version, setup):
+    """Cells (rows, cols, values) a qrcode setup_* call writes."""
+    qr = _blank(version)
+    qr.modules = [[None] * qr.modules_count for _ in range(qr.modules_count)]
+    setup(qr)
+    cells = [
+        (r, c, value)
+        for r, row in enumerate(qr.modules)
+        for c, value in enumerate(row)
+        if value is not None
+    ]
+    rows, cols, values = zip(*cells)
+    return (
+        _frozen(np.array(rows, dtype=np.int16)),
+        _frozen(np.array(cols, dtype=np.int16)),
+        _frozen(np.array(values, dtype=bool)),
+    )
+
+
+def format_overlay(version, error_correction, pattern):
+    """Format information cells (and the dark module) for a level and mask."""
+    def build(key):
+        version, error_correction, pattern = key
+
+        def setup(qr):
+            qr.error_correction = error_correction
+            qr.setup_type_info(False, pattern)
+        return _overlay(version, setup)
+    return default_tables.get('format', (version, error_correction, pattern), build)
+
+
+def version_overlay(version):
+    """Version information cells (versions 7+), or None."""
+    def build(version):
+        if version < 7:
+            return ()
+        return _overlay(version, lambda qr: qr.setup_type_number(False))
+    return default_tables.get('version', version, build) or None
+
+
+def unmasked_matrix(version, error_correction, data_list):
+    """
+    Lay out encoded data on the version template without a mask.
+
+    Returns:
+        ndarray: Writable bool matrix with format and version information
+            left light, ready for masking
+    """
+    modules, _, rows, cols = template(version)
+    bits = np.unpackbits(codewords(version, error_correction, data_list))
+    # Remainder bits after the last codeword are left light, as in map_data()
+    placed = np.zeros(len(rows), dtype=bool)
+    count = min(len(bits), len(rows))
+    placed[:count] = bits[:count]
+    matrix = modules.copy()
+    matrix[rows, cols] = placed
+    return matrix
+
+
+def finish(matrix, version, error_correction, pattern):
+    """Write the final format and version information into a masked matrix."""
+    rows, cols, values = format_overlay(version, error_correction, pattern)
+    matrix[rows, cols] = values
+    overlay = version_overlay(version)
+    if overlay is not None:
+        rows, cols, values = overlay
+        matrix[rows, cols] = values
+    return matrix
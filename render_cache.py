@@ -0,0 +1,210 @@
+"""
+QR Code Render Cache
+Content-addressed two-tier (memory + disk) cache for rendered QR code images
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def make_cache_key(**params):
+    """
+    Build a content-addressed cache key from render parameters.
+
+    Args:
+        **params: Every parameter that influences the rendered output
+
+    Returns:
+        str: Hex SHA-256 digest of the canonicalised parameters
+    """
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """Bounded in-memory LRU cache with an optional size-capped disk tier."""
+
+    def __init__(self, max_entries=256, disk_dir=None, max_disk_bytes=64 * 1024 * 1024,
+                 max_memory_bytes=32 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of images kept in memory
+            disk_dir (str): Directory for the on-disk tier (None disables it)
+            max_disk_bytes (int): Size cap for the on-disk tier in bytes
+            max_memory_bytes (int): Size cap for the in-memory tier in bytes,
+                so a few large images cannot pin hundreds of MB (None limits
+                it by max_entries only)
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, key):
+        """
+        Look up a rendered image.
+
+        Args:
+            key (str): Cache key from make_cache_key()
+
+        Returns:
+            bytes: Cached image bytes, or None on a miss
+        """
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+            if key in self._disk_index:
+                value = self._read_disk(key)
+                if value is not None:
+                    self._disk_index.move_to_end(key)
+                    self._store_memory(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Store a rendered image in both tiers.
+
+        Args:
+            key (str): Cache key from make_cache_key()
+            value (bytes): Image bytes
+        """
+        with self._lock:
+            self._store_memory(key, value)
+            if self.disk_dir and key not in self._disk_index:
+                self._write_disk(key, value)
+
+    def clear(self):
+        """Drop every cached entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in list(self._disk_index):
+                self._remove_disk(key)
+
+    def stats(self):
+        """
+        Get hit/miss/eviction counters.
+
+        Returns:
+            dict: Counter values and current tier sizes
+        """
+        with self._lock:
+            return {
+                'hits': self.memory_hits + self.disk_hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.memory_evictions + self.disk_evictions,
+                'memory_evictions': self.memory_evictions,
+                'disk_evictions': self.disk_evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk_index),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _store_memory(self, key, value):
+        if self.max_memory_bytes is not None and len(value) > self.max_memory_bytes:
+            return
+        self._memory_bytes += len(value) - len(self._memory.get(key, b''))
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries or (
+            self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.memory_evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.bin')
+
+    def _load_disk_index(self):
+        """Rebuild the disk LRU order from file modification times."""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.bin'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+            return value
+        except OSError:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+
+    def _write_disk(self, key, value):
+        if len(value) > self.max_disk_bytes:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+
+        self._disk_index[key] = len(value)
+        self._disk_bytes += len(value)
+        self._evict_disk()
+
+    def _remove_disk(self, key):
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            key = next(iter(self._disk_index))
+            self._remove_disk(key)
+            self.disk_evictions += 1
+
+
+# Process-wide cache shared by every generator that doesn't bring its own
+default_cache = RenderCache()
@@ -0,0 +1,155 @@
+"""
+QR Code Segmenter
+Dynamic-programming split of a payload into numeric, alphanumeric and byte
+segments with the fewest bits, and direct version selection from the
+capacity tables
+"""
+
+import bisect
+
+from qrcode import util
+from qrcode.exceptions import DataOverflowError
+from qrcode.util import QRData
+
+# Indexed by the DP state number
+MODES = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE)
+
+NUMERIC = frozenset(b'0123456789')
+ALPHANUMERIC = frozenset(util.ALPHA_NUM)
+
+# Versions sharing the same character-count field widths
+VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+
+# Cheapest mode of every byte value, indexed like MODES
+CHAR_CLASS = bytes(
+    0 if byte in NUMERIC else 1 if byte in ALPHANUMERIC else 2
+    for byte in range(256)
+)
+
+# Cost of one character in sixths of a bit (numeric 10/3, alphanumeric
+# 11/2, byte 8) so partial groups compare exactly in integers
+CHAR_COSTS = (20, 33, 48)
+
+
+def data_bits(mode, length):
+    """Exact payload bits for length characters in a mode."""
+    if mode == util.MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == util.MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def segment_bits(segments, version):
+    """
+    Exact bit length of segments at a version: mode indicators, count
+    fields and data, the figure qrcode compares with BIT_LIMIT_TABLE.
+
+    Args:
+        segments (list): (mode, bytes) pairs
+        version (int): QR version
+
+    Returns:
+        int: Bits needed
+    """
+    sizes = util.mode_sizes_for_version(version)
+    return sum(4 + sizes[mode] + data_bits(mode, len(chunk)) for mode, chunk in segments)
+
+
+def segment(data, version=1):
+    """
+    Split data into the segments with the fewest total bits.
+
+    Count-field widths differ between version classes (1-9, 10-26, 27-40),
+    so the split is computed for the class the version belongs to.
+
+    Args:
+        data (str or bytes): Payload (str is UTF-8 encoded, as by qrcode)
+        version (int): Any version in the target class
+
+    Returns:
+        list: (mode, bytes) pairs covering the payload in order
+    """
+    data = util.to_bytestring(data)
+    if not data:
+        return []
+
+    sizes = util.mode_sizes_for_version(version)
+    heads = [(4 + sizes[mode]) * 6 for mode in MODES]
+    infinity = float('inf')
+
+    # costs[m]: cheapest encoding of the bytes so far with a segment of mode m
+    # open after them. choices[i][m]: mode byte i is encoded in on that path.
+    costs = heads[:]
+    choices = []
+    for byte in data:
+        # A byte fits its cheapest mode and every more general one
+        cheapest = CHAR_CLASS[byte]
+        current = [infinity, infinity, infinity]
+        chosen = [None, None, None]
+        closed = []
+        for m in range(cheapest, 3):
+            current[m] = cost = costs[m] + CHAR_COSTS[m]
+            chosen[m] = m
+            # Closing a segment rounds it up to whole bits
+            closed.append((-(-cost // 6) * 6, m))
+        for to in range(3):
+            for rounded, frm in closed:
+                if frm != to and rounded + heads[to] < current[to]:
+                    current[to] = rounded + heads[to]
+                    chosen[to] = frm
+        costs = current
+        choices.append(chosen)
+
+    state = min(range(3), key=costs.__getitem__)
+    modes = bytearray(len(data))
+    for index in range(len(data) - 1, -1, -1):
+        state = choices[index][state]
+        modes[index] = state
+
+    segments = []
+    start = 0
+    for index in range(1, len(data) + 1):
+        if index == len(data) or modes[index] != modes[start]:
+            mode = MODES[modes[start]]
+            # Runs longer than the count field allows are split in place
+            limit = (1 << sizes[mode]) - 1
+            for offset in range(start, index, limit):
+                segments.append((mode, data[offset:min(offset + limit, index)]))
+            start = index
+    return segments
+
+
+def fit(data, error_correction):
+    """
+    Find the smallest version that holds the optimally segmented data.
+
+    The split is recomputed for each version class and the version is
+    read from qrcode's capacity table, instead of re-encoding the data
+    version by version as QRCode.best_fit() does.
+
+    Args:
+        data (str or bytes): Payload
+        error_correction (int): qrcode ERROR_CORRECT_* constant
+
+    Returns:
+        tuple: (version, list of QRData segments)
+
+    Raises:
+        DataOverflowError: If the data does not fit in version 40
+    """
+    data = util.to_bytestring(data)
+    limits = util.BIT_LIMIT_TABLE[error_correction]
+    # Every byte costs at least its cheapest mode, which rules out version
+    # classes the data cannot fit without running the split for them
+    floor = sum(CHAR_COSTS[CHAR_CLASS[byte]] for byte in data) // 6
+    for first, last in VERSION_CLASSES:
+        if floor > limits[last]:
+            needed = floor
+            continue
+        segments = segment(data, first)
+        needed = segment_bits(segments, first)
+        version = bisect.bisect_left(limits, needed, first, last + 1)
+        if version <= last:
+            return version, [QRData(chunk, mode, check_data=False) for mode, chunk in segments]
+    raise DataOverflowError(f"Data needs {needed} bits, more than version 40 holds")
@@ -0,0 +1,226 @@
+"""
+QR Code Serializers
+Direct serializers from the module matrix to SVG, PBM/PGM and packed bits,
+for consumers that do not need a rasterized PNG
+"""
+
+from html import escape
+
+from PIL import ImageColor
+
+# Output format -> (file extension, MIME type)
+OUTPUT_FORMATS = {
+    'png': ('png', 'image/png'),
+    'svg': ('svg', 'image/svg+xml'),
+    'pbm': ('pbm', 'image/x-portable-bitmap'),
+    'pgm': ('pgm', 'image/x-portable-graymap'),
+    'bits': ('bin', 'application/octet-stream'),
+}
+
+# Header of the packed-bit format: 2-byte big-endian matrix size
+BITS_HEADER_SIZE = 2
+
+
+def _svg_color(color):
+    """Format a PIL-style color (name, hex or tuple) for an SVG attribute."""
+    if isinstance(color, str):
+        return escape(color, quote=True)
+    color = tuple(color)
+    if len(color) == 4:
+        return f'rgba({color[0]},{color[1]},{color[2]},{color[3] / 255:g})'
+    return f'rgb({color[0]},{color[1]},{color[2]})'
+
+
+def _runs(row):
+    """Yield (start, length) for each run of dark modules in a row."""
+    start = None
+    for col, dark in enumerate(row):
+        if dark and start is None:
+            start = col
+        elif not dark and start is not None:
+            yield start, col - start
+            start = None
+    if start is not None:
+        yield start, len(row) - start
+
+
+def to_svg(modules, box_size=10, border=4, fill_color='black', back_color='white'):
+    """
+    Serialize a module matrix as SVG.
+
+    All dark modules are drawn as a single path, with horizontal runs merged
+    into one rectangle each, in module units scaled by the viewBox.
+
+    Args:
+        modules: 2D boolean matrix (list of lists or NumPy array)
+        box_size (int): Pixels per module (sets the width and height)
+        border (int): Quiet-zone width in modules
+        fill_color: Color of the QR code boxes
+        back_color: Background color ('transparent' for none)
+
+    Returns:
+        bytes: UTF-8 SVG document
+    """
+    size = len(modules)
+    extent = size + 2 * border
+    pixels = extent * box_size
+
+    commands = []
+    for y, row in enumerate(modules):
+        for x, length in _runs(row):
+            commands.append(f'M{x + border} {y + border}h{length}v1h-{length}z')
+
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {extent} {extent}" shape-rendering="crispEdges">',
+    ]
+    if not (isinstance(back_color, str) and back_color.lower() == 'transparent'):
+        parts.append(f'<rect width="{extent}" height="{extent}" fill="{_svg_color(back_color)}"/>')
+    parts.append(f'<path fill="{_svg_color(fill_color)}" d="{"".join(commands)}"/>')
+    parts.append('</svg>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def _padded_rows(modules, border):
+    """Yield each module row with the quiet zone added, plus border rows."""
+    width = len(modules) + 2 * border
+    blank = [False] * width
+    side = [False] * border
+    for _ in range(border):
+        yield blank
+    for row in modules:
+        yield side + [bool(dark) for dark in row] + side
+    for _ in range(border):
+        yield blank
+
+
+def to_pbm(modules, box_size=10, border=4):
+    """
+    Serialize a module matrix as a binary PBM (P4) bitmap.
+
+    Args:
+        modules: 2D boolean matrix (list of lists or NumPy array)
+        box_size (int): Pixels per module
+        border (int): Quiet-zone width in modules
+
+    Returns:
+        bytes: PBM image, 1 bits are dark
+    """
+    pixels = (len(modules) + 2 * border) * box_size
+    padding = -pixels % 8
+    dark, light = '1' * box_size, '0' * box_size
+
+    body = []
+    for row in _padded_rows(modules, border):
+        bits = ''.join(dark if module else light for module in row) + '0' * padding
+        # Each module row is box_size identical pixel rows
+        body.append(int(bits, 2).to_bytes(len(bits) // 8, 'big') * box_size)
+
+    return f'P4\n{pixels} {pixels}\n'.encode('ascii') + b''.join(body)
+
+
+def to_pgm(modules, box_size=10, border=4, fill_color='black', back_color='white'):
+    """
+    Serialize a module matrix as a binary PGM (P5) graymap.
+
+    Colors are converted to their gray level. PGM has no alpha channel,
+    so 'transparent' is flattened to white (255), as on paper.
+
+    Args:
+        modules: 2D boolean matrix (list of lists or NumPy array)
+        box_size (int): Pixels per module
+        border (int): Quiet-zone width in modules
+        fill_color: Color of the QR code boxes
+        back_color: Background color
+
+    Returns:
+        bytes: 8-bit PGM image
+    """
+    pixels = (len(modules) + 2 * border) * box_size
+    dark = bytes([_gray(fill_color)]) * box_size
+    light = bytes([_gray(back_color)]) * box_size
+
+    body = []
+    for row in _padded_rows(modules, border):
+        body.append(b''.join(dark if module else light for module in row) * box_size)
+
+    return f'P5\n{pixels} {pixels}\n255\n'.encode('ascii') + b''.join(body)
+
+
+def _gray(color):
+    if isinstance(color, str):
+        if color.lower() == 'transparent':
+            return 255
+        return ImageColor.getcolor(color, 'L')
+    red, green, blue = tuple(color)[:3]
+    # ITU-R 601-2 luma, as PIL's "L" conversion
+    return (red * 299 + green * 587 + blue * 114) // 1000
+
+
+def pack_bits(modules):
+    """
+    Pack a module matrix into bytes.
+
+    Layout: the matrix size as a 2-byte big-endian integer, then every
+    module row by row, one bit each (1 = dark, most significant bit first),
+    zero-padded to a whole byte at the end. No quiet zone is included.
+
+    Args:
+        modules: Square 2D boolean matrix (list of lists or NumPy array)
+
+    Returns:
+        bytes: Packed matrix
+    """
+    size = len(modules)
+    bits = ''.join('1' if module else '0' for row in modules for module in row)
+    length = (len(bits) + 7) // 8
+    packed = int(bits, 2) << (length * 8 - len(bits)) if bits else 0
+    return size.to_bytes(BITS_HEADER_SIZE, 'big') + packed.to_bytes(length, 'big')
+
+
+def unpack_bits(data):
+    """
+    Unpack a matrix produced by pack_bits().
+
+    Args:
+        data (bytes): Packed matrix
+
+    Returns:
+        list: Module rows as lists of booleans
+    """
+    size = int.from_bytes(data[:BITS_HEADER_SIZE], 'big')
+    bits = bin(int.from_bytes(data[BITS_HEADER_SIZE:], 'big') | 1 << (len(data) - BITS_HEADER_SIZE) * 8)
+    # Skip the '0b1' guard prefix that preserves leading zero bits
+    bits = bits[3:]
+    return [
+        [bit == '1' for bit in bits[row * size:(row + 1) * size]]
+        for row in range(size)
+    ]
+
+
+def serialize(modules, output_format, box_size=10, border=4,
+              fill_color='black', back_color='white'):
+    """
+    Serialize a module matrix in a non-raster output format.
+
+    Args:
+        modules: 2D boolean matrix
+        output_format (str): 'svg', 'pbm', 'pgm' or 'bits'
+        box_size (int): Pixels per module (ignored by 'bits')
+        border (int): Quiet-zone width in modules (ignored by 'bits')
+        fill_color: Color of the QR code boxes (ignored by 'pbm' and 'bits')
+        back_color: Background color (ignored by 'pbm' and 'bits')
+
+    Returns:
+        bytes: Serialized matrix
+    """
+    if output_format == 'svg':
+        return to_svg(modules, box_size, border, fill_color, back_color)
+    if output_format == 'pbm':
+        return to_pbm(modules, box_size, border)
+    if output_format == 'pgm':
+        return to_pgm(modules, box_size, border, fill_color, back_color)
+    if output_format == 'bits':
+        return pack_bits(modules)
+    raise ValueError(f"Unknown output format: {output_format}")
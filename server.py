@@ -0,0 +1,431 @@
+"""
+QR Code HTTP Service
+Headless rendering API around QRCodeGenerator with deterministic ETags,
+long-lived Cache-Control, a bounded worker pool with backpressure and a
+Prometheus /metrics endpoint
+
+Usage:
+    python server.py --port 8080 --workers 4 --queue-depth 16
+    curl 'http://localhost:8080/qr?data=https://example.com&fg=%23000&bg=white&box=10&format=svg'
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from backend import ERROR_CORRECTION_LEVELS, QRCodeGenerator, _render_batch_chunk
+from metrics import CONTENT_TYPE, default_metrics
+from qr_tables import default_tables, worker_initializer
+from qrcode.exceptions import DataOverflowError
+from render_cache import RenderCache
+from segmenter import fit
+from serializers import OUTPUT_FORMATS
+
+# Responses are a pure function of the URL, so caches may keep them forever
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+MAX_DATA_LENGTH = 4096
+MAX_BOX_SIZE = 50
+MAX_BORDER = 20
+
+# Largest image side in pixels per raster format; 'svg' and 'bits' do not
+# grow with the box size. A 4096x4096 PGM is 16 MB.
+MAX_IMAGE_SIDE = {'png': 4096, 'pbm': 8192, 'pgm': 4096}
+
+# Memory for cached responses, shared by every render setting
+CACHE_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+class BadRequest(ValueError):
+    """Invalid query parameters."""
+
+
+class RenderPool:
+    """
+    Bounded render pool.
+
+    At most workers renders run at once and queue_depth more may wait;
+    beyond that, submit() refuses work instead of queueing without limit.
+    """
+
+    def __init__(self, workers=None, queue_depth=None, processes=True, timeout=30,
+                 metrics=None):
+        """
+        Args:
+            workers (int): Concurrent renders (defaults to CPU count)
+            queue_depth (int): Renders allowed to wait for a worker
+                (defaults to 4 per worker)
+            processes (bool): Render in worker processes (True) or threads
+            timeout (float): Seconds a request waits for its render
+            metrics (Metrics): Registry for pool metrics (None disables them)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = self.workers * 4 if queue_depth is None else queue_depth
+        self.timeout = timeout
+        if processes:
+            # Build the templates once here rather than in every worker
+            default_tables.warm()
+            initializer, initargs = worker_initializer()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=initializer,
+                                                 initargs=initargs)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.processes = processes
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.metrics = metrics
+
+    def render(self, settings, data):
+        """
+        Render one payload in the pool.
+
+        Returns:
+            BatchResult: The render result, or None if the pool is saturated
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            if self.metrics is not None:
+                self.metrics.counter(
+                    'qr_server_rejected_total', 'Renders refused because the pool was full.'
+                ).inc()
+            return None
+        with self._lock:
+            self.in_flight += 1
+            in_flight = self.in_flight
+        self._report_in_flight(in_flight)
+        start = time.perf_counter()
+        try:
+            # Threads report stage timings straight to the shared registry;
+            # worker processes return them with the result
+            shared = None if self.processes else self.metrics
+            future = self._executor.submit(_render_batch_chunk, settings, [(0, data)], shared)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the render ends, not when the caller gives
+        # up on it, so timed-out renders still count against the queue
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result, = future.result(timeout=self.timeout)
+            if self.metrics is not None:
+                self.metrics.observe_stages(result.timings)
+            return result
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.histogram(
+                    'qr_server_render_seconds', 'Pool render time, including queueing.'
+                ).observe(time.perf_counter() - start)
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            in_flight = self.in_flight
+        self._report_in_flight(in_flight)
+        self._slots.release()
+
+    def _report_in_flight(self, in_flight):
+        if self.metrics is not None:
+            self.metrics.gauge(
+                'qr_server_renders_in_flight', 'Renders running or queued in the pool.'
+            ).set(in_flight)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue_depth,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class QRRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /qr, GET /healthz and GET /metrics."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'QRCodeService/1.0'
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        if url.path == '/qr':
+            self._serve_qr(parse_qs(url.query), send_body)
+        elif url.path == '/healthz':
+            body = json.dumps(self.server.pool.stats()).encode('utf-8')
+            self._send(200, body, 'application/json', send_body, {'Cache-Control': 'no-store'})
+        elif url.path == '/metrics' and self.server.metrics is not None:
+            body = self.server.metrics.render().encode('utf-8')
+            self._send(200, body, CONTENT_TYPE, send_body, {'Cache-Control': 'no-store'})
+        else:
+            self._send_error(404, 'Not found', send_body)
+
+    def _serve_qr(self, query, send_body):
+        try:
+            params = parse_params(query)
+        except BadRequest as e:
+            self._send_error(400, str(e), send_body)
+            return
+
+        generator = self.server.generator_for(params)
+        cache_key = generator._cache_key(
+            params['data'], params['fg'], params['bg'], params['format']
+        )
+        etag = f'"{cache_key}"'
+        _, mime = OUTPUT_FORMATS[params['format']]
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self._send(304, b'', None, False, headers)
+            return
+
+        image = generator.cache.get(cache_key) if generator.cache is not None else None
+        if generator.metrics is not None:
+            generator.metrics.count_render(params['format'], 'miss' if image is None else 'hit')
+        if image is None:
+            settings = generator.render_settings(params['fg'], params['bg'], params['format'])
+            # Workers render uncached; the result is cached here instead
+            settings['cache'] = False
+            try:
+                result = self.server.pool.render(settings, params['data'])
+            except FutureTimeoutError:
+                self._send_error(503, 'Render timed out', send_body, {'Retry-After': '1'})
+                return
+
+            if result is None:
+                self._send_error(503, 'Server busy, retry later', send_body, {'Retry-After': '1'})
+                return
+            if result.error:
+                self._send_error(400, result.error, send_body)
+                return
+
+            image = result.image
+            if generator.cache is not None:
+                generator.cache.put(cache_key, image)
+
+        self._send(200, image, mime, send_body, headers)
+
+    def _send(self, status, body, content_type, send_body, headers=None):
+        if self.server.metrics is not None:
+            self.server.metrics.counter(
+                'qr_http_responses_total', 'HTTP responses by status code.', ('status',)
+            ).inc(status=status)
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if status != 304:
+            # A 304 carries no body and must not claim a length (RFC 9110 8.6)
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def _send_error(self, status, message, send_body, headers=None):
+        body = json.dumps({'error': message}).encode('utf-8')
+        headers = dict(headers or {}, **{'Cache-Control': 'no-store'})
+        self._send(status, body, 'application/json', send_body, headers)
+
+
+def parse_params(query):
+    """
+    Validate /qr query parameters.
+
+    Args:
+        query (dict): Parsed query string (parse_qs output)
+
+    Returns:
+        dict: data, fg, bg, box, border, ecc and format
+
+    Raises:
+        BadRequest: If a parameter is missing or invalid
+    """
+    def get(name, default=None):
+        values = query.get(name)
+        return values[0] if values else default
+
+    data = get('data', '')
+    if not data.strip():
+        raise BadRequest("Missing 'data' parameter")
+    if len(data) > MAX_DATA_LENGTH:
+        raise BadRequest(f"'data' is longer than {MAX_DATA_LENGTH} characters")
+
+    def bounded_int(name, default, low, high):
+        value = get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise BadRequest(f"'{name}' must be an integer")
+        if not low <= value <= high:
+            raise BadRequest(f"'{name}' must be between {low} and {high}")
+        return value
+
+    output_format = get('format', 'png')
+    if output_format not in OUTPUT_FORMATS:
+        raise BadRequest(f"'format' must be one of: {', '.join(OUTPUT_FORMATS)}")
+    ecc = get('ecc', 'L').upper()
+    if ecc not in ERROR_CORRECTION_LEVELS:
+        raise BadRequest(f"'ecc' must be one of: {', '.join(ERROR_CORRECTION_LEVELS)}")
+
+    params = {
+        'data': data,
+        'fg': get('fg', 'black'),
+        'bg': get('bg', 'white'),
+        'box': bounded_int('box', 10, 1, MAX_BOX_SIZE),
+        'border': bounded_int('border', 4, 0, MAX_BORDER),
+        'ecc': ecc,
+        'format': output_format,
+    }
+
+    limit = MAX_IMAGE_SIDE.get(output_format)
+    if limit is not None:
+        side = image_side(params)
+        if side > limit:
+            raise BadRequest(
+                f"Image would be {side}x{side} pixels; '{output_format}' allows at most "
+                f"{limit}x{limit}, use a smaller 'box' or 'border'"
+            )
+    return params
+
+
+def image_side(params):
+    """
+    Side length in pixels of the image a request renders.
+
+    The version is predicted as the generator's default (optimal)
+    segmentation picks it, without encoding the data.
+
+    Raises:
+        BadRequest: If the data does not fit in a QR code
+    """
+    try:
+        version, _ = fit(params['data'], ERROR_CORRECTION_LEVELS[params['ecc']])
+    except DataOverflowError:
+        raise BadRequest("'data' is too long for a QR code at this 'ecc' level")
+    return (version * 4 + 17 + 2 * params['border']) * params['box']
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against a strong ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class QRServer(ThreadingHTTPServer):
+    """HTTP server owning the render pool and per-settings generators."""
+
+    daemon_threads = True
+
+    def __init__(self, address, pool, png_compression='default', verbose=False,
+                 metrics=default_metrics, cache=None):
+        super().__init__(address, QRRequestHandler)
+        if cache is None:
+            cache = RenderCache(max_entries=4096, max_memory_bytes=CACHE_MEMORY_BYTES)
+        self.cache = cache
+        self.pool = pool
+        self.metrics = metrics
+        self.png_compression = png_compression
+        self.verbose = verbose
+        self._generators = {}
+        self._generators_lock = threading.Lock()
+
+    def generator_for(self, params):
+        """Get the (shared-cache) generator for a request's render settings."""
+        key = (params['box'], params['border'], params['ecc'])
+        with self._generators_lock:
+            generator = self._generators.get(key)
+            if generator is None:
+                generator = self._generators[key] = QRCodeGenerator(
+                    box_size=params['box'],
+                    border=params['border'],
+                    error_correction=params['ecc'],
+                    png_compression=self.png_compression,
+                    cache=self.cache,
+                    metrics=self.metrics or False,
+                )
+            return generator
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+def build_parser():
+    """Build the command-line argument parser."""
+    parser = argparse.ArgumentParser(description="Serve QR codes over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind")
+    parser.add_argument('--port', type=int, default=8080, help="Port to bind")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Concurrent renders (default: CPU count)")
+    parser.add_argument('--queue-depth', type=int, default=None,
+                        help="Renders allowed to wait before answering 503 (default: 4 per worker)")
+    parser.add_argument('--threads', action='store_true',
+                        help="Render in threads instead of worker processes")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-render timeout in seconds")
+    parser.add_argument('--compression', default='default',
+                        choices=['fastest', 'default', 'smallest'], help="PNG compression preset")
+    parser.add_argument('--cache-mb', type=float, default=CACHE_MEMORY_BYTES / (1024 * 1024),
+                        help="Memory for cached responses in MB")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log every request")
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    pool = RenderPool(args.workers, args.queue_depth, not args.threads, args.timeout,
+                      default_metrics)
+    cache = RenderCache(max_entries=4096, max_memory_bytes=int(args.cache_mb * 1024 * 1024))
+    server = QRServer((args.host, args.port), pool, args.compression, args.verbose,
+                      cache=cache)
+    stats = pool.stats()
+    print(
+        f"Serving on http://{args.host}:{server.server_address[1]} "
+        f"({stats['workers']} workers, queue depth {stats['queue_depth']})",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
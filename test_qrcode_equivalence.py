@@ -0,0 +1,161 @@
+"""
+QR Code Equivalence Tests
+Checks that the NumPy encoder (qr_tables, mask_penalty) and the segmenter
+produce what the qrcode library itself would, so a qrcode upgrade that
+changes its internals fails here instead of silently changing codes
+
+Run with: python -m pytest -q
+"""
+
+import itertools
+import random
+
+import pytest
+import qrcode
+from qrcode import util
+
+from backend import ERROR_CORRECTION_LEVELS, QRCodeGenerator
+from qr_tables import codewords
+from segmenter import MODES, fit, segment, segment_bits
+
+LEVELS = sorted(ERROR_CORRECTION_LEVELS)
+VERSIONS = range(1, 41)
+
+VALID_CHARS = {
+    util.MODE_NUMBER: frozenset(b'0123456789'),
+    util.MODE_ALPHA_NUM: frozenset(util.ALPHA_NUM),
+}
+
+
+def byte_payload(version, level):
+    """Longest lowercase payload that fits a version (pure byte mode)."""
+    limit = util.BIT_LIMIT_TABLE[ERROR_CORRECTION_LEVELS[level]][version]
+    count_bits = util.length_in_bits(util.MODE_8BIT_BYTE, version)
+    length = (limit - 4 - count_bits) // 8
+    return ''.join(random.Random(version).choice('abcdefghijklmnopqrstuvwxyz')
+                   for _ in range(length))
+
+
+def mixed_payload(rng, length):
+    """Payload mixing digit runs, uppercase/URL runs and arbitrary text."""
+    pools = ('0123456789', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 $%*+-./:', 'abcxyz?&=é_')
+    parts = []
+    while sum(map(len, parts)) < length:
+        pool = rng.choice(pools)
+        parts.append(''.join(rng.choice(pool) for _ in range(rng.randint(1, 12))))
+    return ''.join(parts)[:length]
+
+
+def reference_modules(level, mask_pattern, data=None, version=None, data_list=()):
+    """Matrix from QRCode.make(): fitted for data, or at version for data_list."""
+    qr = qrcode.QRCode(version=version, error_correction=ERROR_CORRECTION_LEVELS[level],
+                       mask_pattern=mask_pattern)
+    if data is not None:
+        qr.add_data(data)
+        qr.make()
+    else:
+        qr.data_list.extend(data_list)
+        qr.make(fit=False)
+    return qr.modules
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('version', VERSIONS)
+def test_make_matrix_fixed_mask(level, version):
+    mask_pattern = version % 8
+    data = byte_payload(version, level)
+    generator = QRCodeGenerator(error_correction=level, mask_pattern=mask_pattern,
+                                segmentation='qrcode', cache=False)
+    matrix = generator.make_matrix(data)
+    assert len(matrix) == version * 4 + 17
+    assert matrix == reference_modules(level, mask_pattern, data=data)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('version', VERSIONS)
+def test_make_matrix_best_mask(level, version):
+    data = byte_payload(version, level)
+    generator = QRCodeGenerator(error_correction=level, segmentation='qrcode', cache=False)
+    assert generator.make_matrix(data) == reference_modules(level, None, data=data)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('mask_pattern', [None, *range(8)])
+def test_make_matrix_optimal_segmentation(level, mask_pattern):
+    rng = random.Random(f'{level}{mask_pattern}')
+    generator = QRCodeGenerator(error_correction=level, mask_pattern=mask_pattern, cache=False)
+    for length in (1, 17, 90, 250, 600):
+        data = mixed_payload(rng, length)
+        if not data.strip():
+            continue
+        version, segments = fit(data, ERROR_CORRECTION_LEVELS[level])
+        expected = reference_modules(level, mask_pattern, version=version, data_list=segments)
+        assert generator.make_matrix(data) == expected
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_codewords_match_create_data(level):
+    error_correction = ERROR_CORRECTION_LEVELS[level]
+    rng = random.Random(level)
+    for version in VERSIONS:
+        data = mixed_payload(rng, rng.randint(1, 2 * version * version))
+        try:
+            fitted, segments = fit(data, error_correction)
+        except qrcode.exceptions.DataOverflowError:
+            continue
+        for at in {fitted, max(fitted, version)}:
+            assert list(codewords(at, error_correction, segments)) == \
+                list(util.create_data(at, error_correction, segments))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_segment_round_trip(seed):
+    rng = random.Random(seed)
+    data = mixed_payload(rng, rng.randint(1, 3000)).encode('utf-8')
+    for version in (1, 10, 27):
+        segments = segment(data, version)
+        assert b''.join(chunk for _, chunk in segments) == data
+        sizes = util.mode_sizes_for_version(version)
+        for mode, chunk in segments:
+            assert mode in MODES
+            assert 0 < len(chunk) < 1 << sizes[mode]
+            if mode in VALID_CHARS:
+                assert set(chunk) <= VALID_CHARS[mode]
+
+
+def test_segment_is_optimal():
+    """The DP split equals an exhaustive search over per-character modes."""
+    rng = random.Random(0)
+    alphabet = '0123456789AZ $:az'
+    for _ in range(100):
+        data = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))).encode()
+        best = None
+        for modes in itertools.product(MODES, repeat=len(data)):
+            if any(mode in VALID_CHARS and byte not in VALID_CHARS[mode]
+                   for mode, byte in zip(modes, data)):
+                continue
+            runs = [(mode, bytes(byte for _, byte in run))
+                    for mode, run in itertools.groupby(zip(modes, data), key=lambda pair: pair[0])]
+            bits = segment_bits(runs, 1)
+            best = bits if best is None else min(best, bits)
+        assert segment_bits(segment(data, 1), 1) == best
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_fit_versions(level):
+    """fit() picks the smallest version for its split, never above qrcode's."""
+    error_correction = ERROR_CORRECTION_LEVELS[level]
+    limits = util.BIT_LIMIT_TABLE[error_correction]
+    rng = random.Random(level)
+    for _ in range(30):
+        data = mixed_payload(rng, rng.randint(1, 600))
+        version, segments = fit(data, error_correction)
+        pairs = [(item.mode, item.data) for item in segments]
+        assert b''.join(chunk for _, chunk in pairs) == data.encode('utf-8')
+        assert segment_bits(pairs, version) <= limits[version]
+        if version > 1:
+            assert segment_bits(segment(data, version - 1), version - 1) > limits[version - 1]
+
+        reference = qrcode.QRCode(error_correction=error_correction)
+        reference.add_data(data)
+        assert version <= reference.best_fit()
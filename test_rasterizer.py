@@ -0,0 +1,83 @@
+"""
+Rasterizer Tests
+Checks that the 'numpy' renderer draws exactly the pixels of the qrcode
+library's QRCode.make_image(), for every color form and segmentation
+
+Run with: python -m pytest -q
+"""
+
+import pytest
+import qrcode
+from PIL import Image
+
+from backend import ERROR_CORRECTION_LEVELS, SEGMENTATIONS, QRCodeGenerator
+from rasterizer import rasterize
+from segmenter import fit
+
+pytest.importorskip('numpy')
+
+COLORS = [
+    ('black', 'white'),
+    ('white', 'black'),
+    ('#1a73e8', '#ffffff'),
+    ('#0F0', 'navy'),
+    ((200, 30, 60), (250, 250, 210)),
+    ('black', 'transparent'),
+    ('#4b0082', 'transparent'),
+]
+PAYLOADS = ['HELLO WORLD 0123456789', 'https://example.com/path?q=1&r=2#frag']
+
+
+def reference_qr(data, segmentation, level='M', box_size=3, border=2):
+    """QRCode built the way the generator encodes data for a segmentation."""
+    error_correction = ERROR_CORRECTION_LEVELS[level]
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=box_size, border=border)
+    if segmentation == 'qrcode':
+        qr.add_data(data)
+        qr.make()
+    else:
+        qr.version, segments = fit(data, error_correction)
+        qr.data_list.extend(segments)
+        qr.make(fit=False)
+    return qr
+
+
+def pixels(img):
+    return img.convert('RGBA').tobytes()
+
+
+@pytest.mark.parametrize('segmentation', SEGMENTATIONS)
+@pytest.mark.parametrize('fill_color,back_color', COLORS)
+@pytest.mark.parametrize('data', PAYLOADS)
+def test_numpy_renderer_matches_make_image(data, fill_color, back_color, segmentation):
+    qr = reference_qr(data, segmentation)
+    expected = qr.make_image(fill_color=fill_color, back_color=back_color).get_image()
+
+    generator = QRCodeGenerator(box_size=3, border=2, error_correction='M', cache=False,
+                                renderer='numpy', segmentation=segmentation)
+    buf = generator.generate_qr_code(data, fill_color=fill_color, back_color=back_color)
+    with Image.open(buf) as img:
+        assert img.size == expected.size
+        assert pixels(img) == pixels(expected)
+
+
+@pytest.mark.parametrize('fill_color,back_color', COLORS)
+def test_rasterize_matches_make_image_mode(fill_color, back_color):
+    qr = reference_qr(PAYLOADS[1], 'qrcode', box_size=4, border=1)
+    expected = qr.make_image(fill_color=fill_color, back_color=back_color).get_image()
+
+    img = rasterize(qr.modules, 4, 1, fill_color, back_color)
+    assert img.mode == expected.mode
+    assert img.tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize('fill_color,back_color', COLORS)
+def test_renderers_agree(fill_color, back_color):
+    outputs = []
+    for renderer in ('numpy', 'qrcode'):
+        generator = QRCodeGenerator(box_size=2, border=4, cache=False, renderer=renderer)
+        buf = generator.generate_qr_code(PAYLOADS[0], fill_color=fill_color,
+                                         back_color=back_color)
+        with Image.open(buf) as img:
+            outputs.append(pixels(img))
+    assert outputs[0] == outputs[1]
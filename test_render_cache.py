@@ -0,0 +1,119 @@
+"""
+Render Cache Tests
+LRU order and byte caps of the memory tier, and eviction and index
+recovery of the disk tier
+
+Run with: python -m pytest -q
+"""
+
+import os
+
+from render_cache import RenderCache, default_cache, make_cache_key
+
+
+def keys(cache):
+    return list(cache._memory)
+
+
+def test_make_cache_key_is_order_independent():
+    assert make_cache_key(data='a', box_size=10) == make_cache_key(box_size=10, data='a')
+    assert make_cache_key(data='a', box_size=10) != make_cache_key(data='a', box_size=11)
+
+
+def test_default_cache_is_bounded_in_memory():
+    assert default_cache.max_memory_bytes is not None
+
+
+def test_memory_lru_order():
+    cache = RenderCache(max_entries=3)
+    for key in 'abc':
+        cache.put(key, key.encode())
+    assert cache.get('a') == b'a'
+
+    cache.put('d', b'd')
+
+    assert keys(cache) == ['c', 'a', 'd']
+    assert cache.get('b') is None
+    assert cache.stats()['memory_evictions'] == 1
+
+
+def test_memory_byte_cap():
+    cache = RenderCache(max_entries=100, max_memory_bytes=10)
+    cache.put('a', b'x' * 4)
+    cache.put('b', b'x' * 4)
+    cache.put('c', b'x' * 4)
+    assert keys(cache) == ['b', 'c']
+    assert cache.stats()['memory_bytes'] == 8
+
+    # Replacing a value accounts for the old size
+    cache.put('c', b'x' * 2)
+    assert cache.stats()['memory_bytes'] == 6
+
+    # Values over the cap are not kept in memory at all
+    cache.put('d', b'x' * 11)
+    assert keys(cache) == ['b', 'c']
+
+
+def test_disk_tier_serves_memory_misses(tmp_path):
+    cache = RenderCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    assert keys(cache) == ['b']
+
+    assert cache.get('a') == b'aaaa'
+    stats = cache.stats()
+    assert stats['disk_hits'] == 1 and stats['memory_hits'] == 0
+    assert keys(cache) == ['a']
+
+
+def test_disk_eviction_is_lru(tmp_path):
+    cache = RenderCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=12)
+    for key in 'abc':
+        cache.put(key, key.encode() * 4)
+    cache.get('a')
+
+    cache.put('d', b'dddd')
+
+    assert list(cache._disk_index) == ['c', 'a', 'd']
+    assert sorted(os.listdir(tmp_path)) == ['a.bin', 'c.bin', 'd.bin']
+    stats = cache.stats()
+    assert stats['disk_evictions'] == 1 and stats['disk_bytes'] == 12
+
+
+def test_disk_index_reloads_in_mtime_order(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path))
+    for key in 'abc':
+        cache.put(key, key.encode() * 4)
+    for age, key in enumerate('bca'):
+        os.utime(tmp_path / f'{key}.bin', (1000 + age, 1000 + age))
+    (tmp_path / 'stray.tmp').write_bytes(b'partial write')
+
+    reloaded = RenderCache(disk_dir=str(tmp_path), max_disk_bytes=8)
+
+    # The oldest file is evicted to fit the smaller cap
+    assert list(reloaded._disk_index) == ['c', 'a']
+    assert not (tmp_path / 'b.bin').exists()
+    assert reloaded.get('a') == b'aaaa'
+    assert reloaded.get('b') is None
+    assert reloaded.stats()['disk_bytes'] == 8
+
+
+def test_missing_disk_file_is_a_miss(tmp_path):
+    cache = RenderCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    os.remove(tmp_path / 'a.bin')
+
+    assert cache.get('a') is None
+    assert cache.stats()['disk_entries'] == 1
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path))
+    cache.put('a', b'aaaa')
+    cache.clear()
+
+    assert cache.get('a') is None
+    assert os.listdir(tmp_path) == []
+    stats = cache.stats()
+    assert stats['memory_bytes'] == 0 and stats['disk_bytes'] == 0
@@ -0,0 +1,201 @@
+"""
+Upload Provider Tests
+Provider health bookkeeping and hedged uploads against the local fake
+providers (fake_providers.FakeProviderServer)
+
+Run with: python -m pytest -q
+"""
+
+import time
+
+import pytest
+
+from backend import QRCodeGenerator
+from fake_providers import FakeProviderServer
+from provider_health import CLOSED, HALF_OPEN, OPEN, HealthTracker
+
+PAYLOAD = b'x' * 1024
+SERVICES = ['catbox.moe', 'pixeldrain.com', '0x0.st']
+
+
+class FakeClock:
+    """Manually advanced monotonic clock for HealthTracker."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def providers():
+    with FakeProviderServer() as server:
+        yield server
+
+
+def make_generator(server, **options):
+    options.setdefault('cache', False)
+    options.setdefault('backoff_factor', 0.01)
+    return QRCodeGenerator(endpoints=server.endpoints, **options)
+
+
+def wait_for(condition, timeout=10.0):
+    """Poll until condition() is true, for results recorded by stragglers."""
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def fail(tracker, service, times):
+    for _ in range(times):
+        tracker.record(service, False, 1.0)
+
+
+def test_circuit_opens_after_failure_threshold():
+    tracker = HealthTracker(failure_threshold=3, clock=FakeClock())
+    fail(tracker, 'catbox.moe', 2)
+    assert tracker.stats()['catbox.moe']['state'] == CLOSED
+    assert tracker.rank(SERVICES) == SERVICES
+
+    fail(tracker, 'catbox.moe', 1)
+    assert tracker.stats()['catbox.moe']['state'] == OPEN
+    assert tracker.rank(SERVICES) == SERVICES[1:]
+    assert not tracker.begin_attempt('catbox.moe')
+
+
+def test_success_resets_consecutive_failures():
+    tracker = HealthTracker(failure_threshold=3, clock=FakeClock())
+    fail(tracker, 'catbox.moe', 2)
+    tracker.record('catbox.moe', True, 0.5)
+    fail(tracker, 'catbox.moe', 2)
+    assert tracker.stats()['catbox.moe']['state'] == CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    clock = FakeClock()
+    tracker = HealthTracker(failure_threshold=1, cooldown=60, clock=clock)
+    fail(tracker, 'catbox.moe', 1)
+    clock.now = 59
+    assert tracker.rank(SERVICES) == SERVICES[1:]
+
+    clock.now = 60
+    assert tracker.rank(SERVICES) == SERVICES
+    assert tracker.stats()['catbox.moe']['state'] == HALF_OPEN
+    assert tracker.begin_attempt('catbox.moe')
+    assert not tracker.begin_attempt('catbox.moe')
+
+    # A failed probe re-opens the circuit for another cooldown
+    fail(tracker, 'catbox.moe', 1)
+    assert tracker.stats()['catbox.moe']['state'] == OPEN
+    clock.now = 119
+    assert not tracker.begin_attempt('catbox.moe')
+
+    clock.now = 120
+    assert tracker.begin_attempt('catbox.moe')
+    tracker.record('catbox.moe', True, 0.5)
+    assert tracker.stats()['catbox.moe']['state'] == CLOSED
+    assert tracker.begin_attempt('catbox.moe')
+    assert tracker.begin_attempt('catbox.moe')
+
+
+def test_abandoned_probe_frees_the_slot():
+    clock = FakeClock()
+    tracker = HealthTracker(failure_threshold=1, cooldown=60, clock=clock)
+    fail(tracker, 'catbox.moe', 1)
+    clock.now = 60
+    assert tracker.begin_attempt('catbox.moe')
+    tracker.abandon_attempt('catbox.moe')
+    assert tracker.begin_attempt('catbox.moe')
+
+
+def test_all_open_falls_back_to_probing_every_provider():
+    tracker = HealthTracker(failure_threshold=1, cooldown=300, clock=FakeClock())
+    for service in SERVICES:
+        fail(tracker, service, 1)
+
+    assert tracker.rank(SERVICES) == SERVICES
+    assert all(d['state'] == HALF_OPEN and not d['skipped'] for d in tracker.last_ranking)
+    for service in SERVICES:
+        assert tracker.begin_attempt(service)
+        assert not tracker.begin_attempt(service)
+
+
+def test_adaptive_ranking_demotes_slow_providers():
+    tracker = HealthTracker(ranking='adaptive', latency_weight=0.1, clock=FakeClock())
+    assert tracker.rank(SERVICES)[0] == 'catbox.moe'
+    tracker.record('catbox.moe', True, 30.0)
+    assert tracker.rank(SERVICES)[-1] == 'catbox.moe'
+
+
+def test_hedged_upload_prefers_higher_ranked_success(providers):
+    providers.set_behavior('catbox.moe', latency=0.5)
+    generator = make_generator(providers, hedge_delay=0.05, upload_deadline=5)
+
+    result = generator.upload_file_and_get_link(PAYLOAD, 'file.bin')
+
+    # The hedges finish first, but catbox is preferred and still succeeds
+    assert result['success'] and result['service'] == 'catbox.moe'
+    stats = providers.stats()
+    assert stats['pixeldrain.com']['requests'] == 1
+    assert stats['catbox.moe']['requests'] == 1
+
+
+def test_hedged_upload_falls_through_failures_in_order(providers):
+    providers.set_behavior('catbox.moe', error_rate=1.0, error_status=400)
+    generator = make_generator(providers, hedge_delay=1.0, upload_deadline=5)
+
+    result = generator.upload_file_and_get_link(PAYLOAD, 'file.bin')
+
+    assert result['success'] and result['service'] == 'pixeldrain.com'
+    assert generator.health.stats()['catbox.moe']['failures'] == 1
+
+
+def test_deadline_returns_best_success_so_far(providers):
+    providers.set_behavior('catbox.moe', hang_rate=1.0, hang_time=30)
+    providers.set_behavior('0x0.st', latency=0.05)
+    generator = make_generator(providers, hedge_delay=0.05, upload_deadline=0.5,
+                               read_timeout=3, health=HealthTracker())
+
+    start = time.monotonic()
+    result = generator.upload_file_and_get_link(PAYLOAD, 'file.bin')
+
+    assert time.monotonic() - start < 1.5
+    assert result['success'] and result['service'] == 'pixeldrain.com'
+
+
+def test_deadline_without_success_fails(providers):
+    for service in ('catbox.moe', 'pixeldrain.com', '0x0.st', 'gofile.io', 'file.io'):
+        providers.set_behavior(service, hang_rate=1.0, hang_time=30)
+    generator = make_generator(providers, hedge_delay=0.05, upload_deadline=0.3,
+                               read_timeout=3)
+
+    result = generator.upload_file_and_get_link(PAYLOAD, 'file.bin')
+
+    assert not result['success']
+    assert 'deadline' in result['message']
+
+
+def test_provider_hanging_past_deadline_counts_as_failing(providers):
+    providers.set_behavior('catbox.moe', hang_rate=1.0, hang_time=30)
+    generator = make_generator(providers, hedge_delay=0.1, upload_deadline=0.5,
+                               read_timeout=1.0)
+
+    for _ in range(3):
+        result = generator.upload_file_and_get_link(PAYLOAD, 'file.bin')
+        assert result['success'] and result['service'] == 'pixeldrain.com'
+
+    # Each catbox attempt is still running at the deadline and only times
+    # out afterwards; those late failures must reach the circuit breaker
+    assert wait_for(lambda: generator.health.stats()['catbox.moe']['failures'] == 3)
+    assert generator.health.stats()['catbox.moe']['state'] == OPEN
+
+    requests = providers.stats()['catbox.moe']['requests']
+    start = time.monotonic()
+    result = generator.upload_file_and_get_link(b'y' * 1024, 'other.bin')
+    assert result['service'] == 'pixeldrain.com'
+    assert time.monotonic() - start < 0.5
+    assert providers.stats()['catbox.moe']['requests'] == requests
@@ -0,0 +1,154 @@
+"""
+Upload Job Queue
+Background upload jobs with IDs, bytes-sent progress and current-provider
+status, so front ends can poll an upload instead of blocking on it
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+UPLOADING = 'uploading'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED_STATES = (DONE, FAILED)
+
+
+class UploadJob:
+    """State of one background upload, updated from the worker thread."""
+
+    def __init__(self, filename, size):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.size = size
+        self.state = QUEUED
+        self.service = None
+        self.bytes_sent = 0
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def _progress(self, service, bytes_sent, total):
+        with self._lock:
+            self.service = service
+            self.bytes_sent = bytes_sent
+            self.size = total
+
+    def snapshot(self):
+        """
+        Get a consistent copy of the job state.
+
+        Returns:
+            dict: id, filename, state, service (provider currently sending),
+                bytes_sent, size, fraction, result (the upload result dict
+                once finished) and timestamps
+        """
+        with self._lock:
+            return {
+                'id': self.id,
+                'filename': self.filename,
+                'state': self.state,
+                'service': self.service,
+                'bytes_sent': self.bytes_sent,
+                'size': self.size,
+                'fraction': min(1.0, self.bytes_sent / self.size) if self.size else 0.0,
+                'result': self.result,
+                'created': self.created,
+                'started': self.started,
+                'finished': self.finished,
+            }
+
+
+class UploadQueue:
+    """
+    Thread pool running QRCodeGenerator uploads as pollable jobs.
+
+    Jobs are looked up by ID, so a UI can keep only the ID between reruns.
+    Finished jobs are kept until max_finished newer ones have finished.
+    """
+
+    def __init__(self, generator, workers=2, max_finished=100):
+        """
+        Args:
+            generator (QRCodeGenerator): Generator whose provider chain,
+                link store and hedging settings are used
+            workers (int): Uploads running at once; more jobs wait queued
+            max_finished (int): Finished jobs retained for polling
+        """
+        self.generator = generator
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='upload-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, file_bytes, filename, size=None):
+        """
+        Queue an upload.
+
+        The content must stay unchanged until the job finishes; bytes,
+        memoryviews and paths are safe to hand over.
+
+        Args:
+            file_bytes: File content, in any form upload_file_and_get_link()
+                accepts
+            filename (str): Name of the file
+            size (int): Content size for progress before the first attempt
+
+        Returns:
+            str: Job ID
+        """
+        job = UploadJob(filename, size)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, file_bytes)
+        return job.id
+
+    def _run(self, job, file_bytes):
+        with job._lock:
+            job.state = UPLOADING
+            job.started = time.time()
+        try:
+            result = self.generator.upload_file_and_get_link(
+                file_bytes, job.filename, progress=job._progress
+            )
+        except Exception as e:
+            print(f"Upload job {job.id} failed: {e}")
+            result = self.generator._upload_failure(f'❌ Upload failed: {e}')
+        with job._lock:
+            job.result = result
+            job.state = DONE if result['success'] else FAILED
+            job.finished = time.time()
+
+    def get(self, job_id):
+        """
+        Get a job's current state.
+
+        Returns:
+            dict: The job snapshot, or None for unknown or pruned IDs
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def jobs(self):
+        """Snapshots of every retained job, oldest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in jobs]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs; queued jobs are cancelled unless wait is True."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
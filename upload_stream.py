@@ -0,0 +1,258 @@
+"""
+Streaming Upload Bodies
+Seekable upload sources and chunked multipart/form-data bodies, so uploads
+never hold more than one chunk of the file in memory
+"""
+
+import io
+import os
+import threading
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadSource:
+    """
+    Re-readable view of upload content.
+
+    Accepts bytes-like objects (including mmap), paths and seekable
+    file-like objects. Reads are positional, so several readers (e.g.
+    parallel provider attempts) can stream the same source independently,
+    and a retry or fallback simply starts again at offset 0.
+    """
+
+    def __init__(self, source):
+        """
+        Wrap upload content.
+
+        Args:
+            source: bytes, bytearray, memoryview, mmap, str/PathLike path or
+                seekable binary file-like object
+        """
+        self._view = None
+        self._file = None
+        self._owns_file = False
+        self._users = 1
+        self._lock = threading.Lock()
+
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb')
+            self._owns_file = True
+            self._origin = 0
+        elif hasattr(source, 'read') and not isinstance(source, (bytes, bytearray, memoryview)):
+            self._file = source
+            self._origin = source.tell()
+        else:
+            self._view = memoryview(source).cast('B')
+
+        if self._view is not None:
+            self.size = len(self._view)
+        else:
+            self._file.seek(0, io.SEEK_END)
+            self.size = self._file.tell() - self._origin
+            self._file.seek(self._origin)
+
+    @property
+    def in_memory(self):
+        """True when reads come from memory and never block on I/O."""
+        return self._view is not None
+
+    def read_at(self, offset, size):
+        """
+        Read up to size bytes starting at offset.
+
+        Args:
+            offset (int): Position relative to the start of the content
+            size (int): Maximum number of bytes to return
+
+        Returns:
+            bytes: The requested slice (shorter at the end of the content)
+        """
+        size = max(0, min(size, self.size - offset))
+        if self._view is not None:
+            return bytes(self._view[offset:offset + size])
+        with self._lock:
+            self._file.seek(self._origin + offset)
+            return self._file.read(size)
+
+    def reader(self):
+        """Get an independent file-like reader positioned at the start."""
+        return SourceReader(self)
+
+    def multipart(self, field, filename, fields=None):
+        """
+        Build a streaming multipart/form-data body for this content.
+
+        Args:
+            field (str): Form field name of the file part
+            filename (str): File name sent with the file part
+            fields (dict): Extra plain form fields sent before the file
+
+        Returns:
+            MultipartStream: Body to pass as requests' data= argument
+        """
+        return MultipartStream(self, field, filename, fields)
+
+    def retain(self):
+        """
+        Register another user of the source, e.g. a background attempt that
+        may outlive the caller. Each retain() needs a matching close().
+        """
+        with self._lock:
+            self._users += 1
+        return self
+
+    def close(self):
+        """
+        Release one user; the last one closes the underlying file if this
+        source opened it.
+        """
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._owns_file:
+                self._file.close()
+
+
+class ProgressSource:
+    """
+    UploadSource view that reports how far into the content it was read.
+
+    Bodies read the file as they send it, so the position is the number of
+    bytes handed to the connection. A retry rewinds it to 0.
+    """
+
+    def __init__(self, source, callback):
+        """
+        Args:
+            source (UploadSource): Content to read
+            callback (callable): Called as callback(bytes_sent) after each read
+        """
+        self._source = source
+        self._callback = callback
+        self.size = source.size
+
+    @property
+    def in_memory(self):
+        return self._source.in_memory
+
+    def read_at(self, offset, size):
+        data = self._source.read_at(offset, size)
+        self._callback(offset + len(data))
+        return data
+
+    reader = UploadSource.reader
+    multipart = UploadSource.multipart
+
+
+class SourceReader(io.RawIOBase):
+    """Positional file-like reader over an UploadSource."""
+
+    def __init__(self, source):
+        self._source = source
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._source.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._source.size - self._pos
+        data = self._source.read_at(self._pos, size)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _quote(value):
+    """Escape a header parameter the way browsers do for form uploads."""
+    return value.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+class MultipartStream:
+    """
+    File-like multipart/form-data body generated on the fly.
+
+    It has a known length (so requests sends Content-Length instead of
+    chunked encoding) and supports tell()/seek() so urllib3 can rewind it
+    when a request is retried.
+    """
+
+    def __init__(self, source, field, filename, fields=None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        head = b''
+        for name, value in (fields or {}).items():
+            head += (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode('utf-8')
+        head += (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{_quote(field)}"; '
+            f'filename="{_quote(filename)}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode('utf-8')
+
+        self._head = head
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        self._source = source
+        self._length = len(head) + source.size + len(self._tail)
+        self._pos = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def headers(self):
+        """Request headers describing this body."""
+        return {'Content-Type': self.content_type}
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._length
+        self._pos = max(0, min(offset, self._length))
+        return self._pos
+
+    def read(self, size=-1):
+        """Read the next piece of the body (at most one chunk of file data)."""
+        if size is None or size < 0:
+            size = CHUNK_SIZE
+        head_len = len(self._head)
+        data_end = head_len + self._source.size
+
+        if self._pos < head_len:
+            chunk = self._head[self._pos:self._pos + size]
+        elif self._pos < data_end:
+            chunk = self._source.read_at(self._pos - head_len, min(size, CHUNK_SIZE))
+        else:
+            start = self._pos - data_end
+            chunk = self._tail[start:start + size]
+
+        self._pos += len(chunk)
+        return chunk